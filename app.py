@@ -7,12 +7,38 @@ import shutil
 import threading
 import uuid
 import re
+import copy
+from array import array
+import functools
+import json
+import hashlib
+import fcntl
+import io
+import heapq
+import bisect
+import gzip
+import sqlite3
+import zipfile
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-
-from flask import Flask, request, jsonify, render_template_string, abort, send_file
+import unicodedata
+import mimetypes
+from types import SimpleNamespace
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+from flask import (
+    Flask, Response, request, jsonify, render_template_string, abort, send_file, stream_with_context,
+    has_request_context,
+)
+from werkzeug.http import http_date
+from werkzeug.middleware.proxy_fix import ProxyFix
 from shutil import which
-from yt_dlp import YoutubeDL
+
+try:
+    import brotli  # optional: adds a br variant of the home page
+except ImportError:
+    brotli = None
 
 # ---------- CONFIG ----------
 DEBUG_LOG = os.environ.get("DEBUG_LOG", "") not in ("", "0", "false", "False")
@@ -20,40 +46,153 @@ PORT = int(os.environ.get("PORT", 5000))
 APP_PREFIX = os.environ.get("APP_PREFIX", "Hyper_Downloader")
 JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 60 * 60))  # 1 hour default
 DOWNLOAD_KEEP_SECONDS = int(os.environ.get("DOWNLOAD_KEEP_SECONDS", 60))  # 60s after fetch
-CLEANUP_INTERVAL = int(os.environ.get("CLEANUP_INTERVAL", 60 * 10))
+CLEANUP_INTERVAL = int(os.environ.get("CLEANUP_INTERVAL", 60 * 10))  # sweep for jobs abandoned by other workers
 MAX_CONCURRENT = int(os.environ.get("MAX_CONCURRENT", 3))  # limit concurrent downloads
-
-app = Flask(__name__)
-
-# Save cookies if present (from environment)
-cookies_data = os.environ.get("COOKIES_TEXT", "").strip()
-if cookies_data:
-    try:
-        with open("cookies.txt", "w", encoding="utf-8") as f:
-            f.write(cookies_data)
-    except Exception:
-        pass
+POSTPROCESS_WORKERS = int(os.environ.get("POSTPROCESS_WORKERS", os.cpu_count() or 1))  # ffmpeg stage pool
+JOB_STORE = os.environ.get("JOB_STORE", "memory").lower()  # memory | sqlite (shared by gunicorn workers)
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "hyper_jobs.sqlite3"))
+JOB_STORE_SYNC_SECONDS = float(os.environ.get("JOB_STORE_SYNC_SECONDS", 0.5))  # progress write-through throttle
+JOB_STORE_MERGE_SECONDS = float(os.environ.get("JOB_STORE_MERGE_SECONDS", 5))  # pick up fetches served by other workers
+JOB_JOURNAL_PATH = os.environ.get("JOB_JOURNAL_PATH", os.path.join(tempfile.gettempdir(), "hyper_jobs.journal"))  # "" disables
+JOURNAL_COMPACT_RECORDS = int(os.environ.get("JOURNAL_COMPACT_RECORDS", 1000))  # superseded records before compacting
+MAX_JOBS = int(os.environ.get("MAX_JOBS", 10000))  # /start answers 503 beyond this many tracked jobs
+MAX_QUEUED_PER_CLIENT = int(os.environ.get("MAX_QUEUED_PER_CLIENT", 20))  # 429 beyond this many waiting jobs
+MAX_JOBS_PER_CLIENT = int(os.environ.get("MAX_JOBS_PER_CLIENT", 200))  # 429 beyond this many tracked jobs per address
+ERROR_KEEP_SECONDS = int(os.environ.get("ERROR_KEEP_SECONDS", 5 * 60))  # failed jobs are dropped this long after failing
+TRUSTED_PROXIES = int(os.environ.get("TRUSTED_PROXIES", 0))  # reverse proxies in front; X-Forwarded-For is ignored at 0
+SPEED_SAMPLES = int(os.environ.get("SPEED_SAMPLES", 8))  # hook speed readings averaged for speed/ETA
+JOB_ESTIMATE_SECONDS = int(os.environ.get("JOB_ESTIMATE_SECONDS", 60))  # assumed job length before any finish
+PROGRESS_STREAM_HZ = float(os.environ.get("PROGRESS_STREAM_HZ", 4))  # max SSE events per second per job
+PROGRESS_STREAM_MAX_SECONDS = int(os.environ.get("PROGRESS_STREAM_MAX_SECONDS", 25))  # < worker timeout; client reconnects
+PROGRESSIVE_FETCH = os.environ.get("PROGRESSIVE_FETCH", "1") not in ("", "0", "false", "False")
+INFO_CACHE_TTL = int(os.environ.get("INFO_CACHE_TTL", 10 * 60))  # metadata kept 10 min
+INFO_CACHE_NEGATIVE_TTL = int(os.environ.get("INFO_CACHE_NEGATIVE_TTL", 30))  # failures kept 30s
+INFO_CACHE_SIZE = int(os.environ.get("INFO_CACHE_SIZE", 200))  # max cached keys (LRU)
+INFO_CACHE_BYTES = int(os.environ.get("INFO_CACHE_BYTES", 64 * 1024 ** 2))  # max estimated size of cached info dicts
+INFO_REUSE_SECONDS = int(os.environ.get("INFO_REUSE_SECONDS", 5 * 60))  # /start reuses /info results this fresh
+FORMAT_URL_MIN_TTL = int(os.environ.get("FORMAT_URL_MIN_TTL", 10 * 60))  # format URLs must outlive this
+OUTPUT_CACHE_DIR = os.environ.get("OUTPUT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hyper_output_cache"))
+OUTPUT_CACHE_BYTES = int(os.environ.get("OUTPUT_CACHE_BYTES", 2 * 1024 ** 3))  # 0 disables the cache
+OUTPUT_CACHE_POLICY = os.environ.get("OUTPUT_CACHE_POLICY", "lru").lower()  # lru | lfu
+DISK_BUDGET_BYTES = int(os.environ.get("DISK_BUDGET_BYTES", 10 * 1024 ** 3))  # job temp dirs; 0 = free space only
+DISK_MIN_FREE_BYTES = int(os.environ.get("DISK_MIN_FREE_BYTES", 512 * 1024 ** 2))  # never fill the volume past this
+DISK_JOB_ESTIMATE_BYTES = int(os.environ.get("DISK_JOB_ESTIMATE_BYTES", 512 * 1024 ** 2))  # when sizes are unknown
+DISK_WAIT_SECONDS = int(os.environ.get("DISK_WAIT_SECONDS", 10 * 60))  # wait for space before failing a job
+BANDWIDTH_LIMIT_BYTES = int(os.environ.get("BANDWIDTH_LIMIT_BYTES", 0))  # link budget in bytes/s; 0 = unlimited
+DELIVERY_HEADROOM = float(os.environ.get("DELIVERY_HEADROOM", 0.25))  # share kept for /fetch while files are sent
+FRAGMENT_CONCURRENCY_START = int(os.environ.get("FRAGMENT_CONCURRENCY_START", 2))  # HLS/DASH fragments per job at first
+FRAGMENT_CONCURRENCY_MAX = int(os.environ.get("FRAGMENT_CONCURRENCY_MAX", 16))  # per-job ceiling while ramping up
+FRAGMENT_CONNECTIONS_MAX = int(os.environ.get("FRAGMENT_CONNECTIONS_MAX", MAX_CONCURRENT * 8))  # across all jobs
+METRICS_DISK_TTL = int(os.environ.get("METRICS_DISK_TTL", 15))  # /metrics re-measures temp dirs at most this often
+JOB_TIMING_LOG = os.environ.get("JOB_TIMING_LOG", "1") not in ("", "0", "false", "False")  # one JSON line per job
+YTDLP_WARMUP = os.environ.get("YTDLP_WARMUP", "1") not in ("", "0", "false", "False")  # load yt-dlp after 1st request
+YTDLP_POOL_SIZE = int(os.environ.get("YTDLP_POOL_SIZE", MAX_CONCURRENT))  # idle YoutubeDLs kept per profile; 0 = off
+YTDLP_POOL_MAX_USES = int(os.environ.get("YTDLP_POOL_MAX_USES", 50))  # jobs per YoutubeDL before it is rebuilt
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 365 * 24 * 60 * 60))  # browser cache for hashed assets
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 3))  # children of one batch in flight at once
+MAX_BATCH_ENTRIES = int(os.environ.get("MAX_BATCH_ENTRIES", 200))  # playlist entries / URLs taken per batch
+
+
+
+class HyperFlask(Flask):
+    def get_send_file_max_age(self, filename):
+        # /static/x.png?v=<content hash> never changes, so browsers may keep it; bare URLs revalidate
+        v = request.args.get("v")
+        if v and v == STATIC_VERSIONS.get(filename):
+            return STATIC_MAX_AGE
+        return super().get_send_file_max_age(filename)
+
+
+app = HyperFlask(__name__)
+if TRUSTED_PROXIES:
+    # the client address is the hop our own proxies appended, not whatever the client sent
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
+
+
+def _write_cookies():
+    # Save cookies if present (from environment)
+    cookies_data = os.environ.get("COOKIES_TEXT", "").strip()
+    if cookies_data:
+        try:
+            with open("cookies.txt", "w", encoding="utf-8") as f:
+                f.write(cookies_data)
+        except Exception:
+            pass
 
 
+@functools.lru_cache(maxsize=None)
 def ffmpeg_path():
+    """Probed on first use and remembered for the life of the process."""
     # prefer which, then common paths
     p = which("ffmpeg")
-    if p:
-        return p
-    for candidate in ("/usr/bin/ffmpeg", "/bin/ffmpeg", "/usr/local/bin/ffmpeg"):
-        if Path(candidate).exists():
-            return candidate
-    return None
+    if not p:
+        for candidate in ("/usr/bin/ffmpeg", "/bin/ffmpeg", "/usr/local/bin/ffmpeg"):
+            if Path(candidate).exists():
+                p = candidate
+                break
+    if DEBUG_LOG:
+        print(f"[DEBUG] ffmpeg found: {p is not None} (path={p})")
+    return p
+
+
+def has_ffmpeg() -> bool:
+    return ffmpeg_path() is not None
+
+
+# ---------- yt-dlp (loaded on first use) ----------
+# Importing yt-dlp and building its extractor list is most of a cold start, and / or
+# /robots.txt never need it, so it is loaded by the first /info or /start, or by the
+# warmup thread once the first request has been answered.
+_YTDLP = None
+_YTDLP_LOCK = threading.Lock()
+_WARMUP_STARTED = False
+
+
+def ytdlp() -> SimpleNamespace:
+    """yt-dlp's YoutubeDL plus the app's subclasses of yt-dlp types, imported once."""
+    global _YTDLP
+    if _YTDLP is None:
+        with _YTDLP_LOCK:
+            if _YTDLP is None:
+                started = time.monotonic()
+                _write_cookies()
+                from yt_dlp import YoutubeDL
+                from yt_dlp.downloader.common import FileDownloader
+                from yt_dlp.networking.exceptions import HTTPError
+                from yt_dlp.postprocessor import PostProcessor
+                from yt_dlp.utils import DownloadError
+                _read_rate_limit_live(FileDownloader)
+                _YTDLP = SimpleNamespace(
+                    YoutubeDL=YoutubeDL,
+                    DownloadError=DownloadError,
+                    StagedYoutubeDL=_staged_youtube_dl_class(YoutubeDL, HTTPError),
+                    DiskReservePP=_disk_reserve_pp_class(PostProcessor),
+                )
+                if DEBUG_LOG:
+                    print(f"[DEBUG] yt-dlp loaded in {time.monotonic() - started:.3f}s")
+    return _YTDLP
+
 
+@app.teardown_request
+def _start_warm_up(exc=None):
+    # started after a response rather than at boot, so it never competes with the first one
+    global _WARMUP_STARTED
+    if YTDLP_WARMUP and not _WARMUP_STARTED:
+        _WARMUP_STARTED = True
+        threading.Thread(target=_warm_up, name="ytdlp-warmup", daemon=True).start()
 
-_FFMPEG = ffmpeg_path()
-if _FFMPEG:
-    HAS_FFMPEG = True
-else:
-    HAS_FFMPEG = False
 
-if DEBUG_LOG:
-    print(f"[DEBUG] ffmpeg found: {HAS_FFMPEG} (path={_FFMPEG})")
+def _warm_up():
+    try:
+        api = ytdlp()
+        # one pooled instance each for /info and the default /start choice
+        YDL_POOL.release(YDL_POOL.lease(*_preview_profile(), api.YoutubeDL))
+        YDL_POOL.release(YDL_POOL.lease(*_download_profile("video", None), api.StagedYoutubeDL))
+    except Exception as e:
+        if DEBUG_LOG:
+            print("[DEBUG] warmup failed:", repr(e))
+
 
 # ---------- HTML (SEO + legal + responsive navbar) ----------
 HTML = """<!doctype html>
@@ -840,7 +979,7 @@ footer{
 </div>
 
 <script>
-let job=null;
+let job=null,streaming=false,live=false;
 const bar=document.getElementById("bar"),pct=document.getElementById("pct");
 const msg=document.getElementById("msg");
 const etaEl=document.getElementById("eta");
@@ -860,7 +999,7 @@ document.getElementById("frm").addEventListener("submit",async(e)=>{
     const r=await fetch("/start",{method:"POST",headers:{"Content-Type":"application/json"},body:JSON.stringify({url,format_choice:fmt,filename:name,video_res,audio_bitrate})});
     const j=await r.json();
     if(!r.ok)throw new Error(j.error||"Failed to start");
-    job=j.job_id;poll();
+    job=j.job_id;streaming=false;live=!!j.live;watch();
   }catch(err){msg.textContent="❌ "+err.message; etaVal.textContent="--";}
 });
 
@@ -896,40 +1035,70 @@ function formatMbps(speed_b){
   return mbps.toFixed(1) + " Mbps";
 }
 
+function render(p){
+  const pctv=Math.max(0,Math.min(100,p.percent||0));
+  bar.style.width=pctv+"%";pct.textContent=pctv+"%";
+
+  if(p.status==="finished"){msg.textContent="✅ Preparing file...";}
+  else if(p.status==="error"){msg.textContent="❌ "+(p.error||"Download failed");}
+  else if(p.stage==="postprocess"){msg.textContent="⚙️ Converting...";}
+  else if(p.stage==="waiting_disk"){msg.textContent="💾 Server is busy, waiting for disk space...";}
+  else if(p.status==="queued" && p.queue_position){msg.textContent="⏳ Queued #"+p.queue_position+(p.eta_start_seconds?" (starts in ~"+formatSeconds(p.eta_start_seconds)+")":"");}
+  else msg.textContent = p.status==="downloaded" ? "✅ Download complete (fetching file)..." : p.status || "Downloading…";
+
+  let etaText="--";
+  if(typeof p.eta_seconds !== "undefined" && p.eta_seconds !== null){
+    etaText = formatSeconds(p.eta_seconds);
+  } else {
+    try{
+      const downloaded = p.downloaded_bytes || 0;
+      const total = p.total_bytes || 0;
+      const speed = p.speed_bytes || 0;
+      if(total>0 && downloaded>0 && speed>0 && downloaded < total){
+        const remain = (total - downloaded)/speed;
+        etaText = formatSeconds(remain);
+      } else {
+        etaText="--";
+      }
+    }catch(e){etaText="--";}
+  }
+  etaVal.textContent = etaText;
+  etaEl.title = "Speed: " + formatMbps(p.speed_bytes || 0);
+
+  if(p.stream_url && !streaming && p.status==="downloading"){ streaming=true; window.location=p.stream_url; }
+  if(p.status==="finished"){ if(!streaming) window.location="/fetch/"+job; job=null; return true; }
+  if(p.status==="error"){ job=null; return true; }
+  return false;
+}
+
+/* Progress via Server-Sent Events, falling back to polling */
+function watch(){
+  if(!job)return;
+  if(!window.EventSource||!live){poll();return;}
+  const id=job;
+  let failures=0;  // reconnects in a row that never opened; the server ends each stream after a while
+  const es=new EventSource("/progress/"+id+"/stream");
+  es.onopen=()=>{ failures=0; };
+  es.onmessage=(e)=>{
+    if(job!==id){es.close();return;}
+    try{ if(render(JSON.parse(e.data))) es.close(); }catch(err){}
+  };
+  es.onerror=()=>{
+    failures++;
+    if(es.readyState===EventSource.CLOSED || failures>=3){
+      es.close();
+      if(job===id) poll();
+    }
+  };
+}
+
 async function poll(){
   if(!job)return;
   try{
     const r=await fetch("/progress/"+job);
     if(r.status===404){msg.textContent="Job expired.";etaVal.textContent="--";job=null;return;}
     const p=await r.json();
-    const pctv=Math.max(0,Math.min(100,p.percent||0));
-    bar.style.width=pctv+"%";pct.textContent=pctv+"%";
-
-    if(p.status==="finished"){msg.textContent="✅ Preparing file...";}
-    else if(p.status==="error"){msg.textContent="❌ "+(p.error||"Download failed");}
-    else msg.textContent = p.status==="downloaded" ? "✅ Download complete (fetching file)..." : p.status || "Downloading…";
-
-    let etaText="--";
-    if(typeof p.eta_seconds !== "undefined" && p.eta_seconds !== null){
-      etaText = formatSeconds(p.eta_seconds);
-    } else {
-      try{
-        const downloaded = p.downloaded_bytes || 0;
-        const total = p.total_bytes || 0;
-        const speed = p.speed_bytes || 0;
-        if(total>0 && downloaded>0 && speed>0 && downloaded < total){
-          const remain = (total - downloaded)/speed;
-          etaText = formatSeconds(remain);
-        } else {
-          etaText="--";
-        }
-      }catch(e){etaText="--";}
-    }
-    etaVal.textContent = etaText;
-    etaEl.title = "Speed: " + formatMbps(p.speed_bytes || 0);
-
-    if(p.status==="finished"){ window.location="/fetch/"+job; job=null; return; }
-    if(p.status==="error"){ job=null; return; }
+    if(render(p)) return;
     setTimeout(poll,800);
   }catch(e){msg.textContent="Network error.";etaVal.textContent="--";job=null;}
 }
@@ -984,15 +1153,432 @@ mobileNavLinks.forEach(a=>{
 </html>
 """
 
+# ---------- Metrics ----------
+_METRICS = []
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _METRICS.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _label_str(self.labels, key), v) for key, v in items]
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][bisect.bisect_left(self.buckets, value)] += 1
+            h[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(h[0]), h[1]) for key, h in self._values.items()]
+        out = []
+        for key, counts, total in items:
+            running = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                running += n
+                out.append((self.name + "_bucket", _label_str(self.labels + ("le",), key + (bound,)), running))
+            out.append((self.name + "_sum", _label_str(self.labels, key), round(total, 6)))
+            out.append((self.name + "_count", _label_str(self.labels, key), running))
+        return out
+
+
+STAGE_SECONDS = Histogram("hyper_stage_seconds", "Time spent per job stage", ("stage",))
+BYTES_IN = Counter("hyper_bytes_in_total", "Bytes downloaded from upstream")
+BYTES_OUT = Counter("hyper_bytes_out_total", "Bytes sent to clients by /fetch")
+JOBS_COMPLETED = Counter("hyper_jobs_completed_total", "Jobs that reached a final state", ("status",))
+JOB_ERRORS = Counter("hyper_job_errors_total", "Failed jobs by reason", ("reason",))
+
+
+def _error_reason(message) -> str:
+    msg = (message or "").lower()
+    if msg.startswith("yt-dlp failed"):
+        return "download"
+    if msg.startswith("post-processing failed"):
+        return "postprocess"
+    if msg.startswith("invalid url"):
+        return "invalid_url"
+    if msg.startswith("no output file"):
+        return "no_output"
+    if msg.startswith("shared download failed"):
+        return "shared"
+    if "disk" in msg:
+        return "disk"
+    return "internal"
+
+
+def _count_outcome(job):
+    JOBS_COMPLETED.inc(status=job.status)
+    if job.status == "error":
+        JOB_ERRORS.inc(reason=_error_reason(job.error))
+
+
+_disk_usage_cache = [0.0, 0]  # monotonic time measured, bytes
+
+
+def _temp_disk_bytes() -> int:
+    now = time.monotonic()
+    if now - _disk_usage_cache[0] >= METRICS_DISK_TTL:
+        _disk_usage_cache[:] = [now, sum(_dir_size(p) for p in TEMP_ROOT.glob("mvd_*"))]
+    return _disk_usage_cache[1]
+
+
 # ---------- Backend objects ----------
-JOBS = {}
+class MemoryJobStore:
+    """Job table local to this process (the default; use a single worker)."""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._jobs = {}
+
+    def __setitem__(self, job_id, job):
+        self._jobs[job_id] = job
+
+    def __getitem__(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __contains__(self, job_id):
+        return self.get(job_id) is not None
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def get(self, job_id, default=None):
+        return self._jobs.get(job_id, default)
+
+    def pop(self, job_id, default=None):
+        return self._jobs.pop(job_id, default)
+
+    def items(self):
+        return list(self._jobs.items())
+
+    def values(self):
+        return list(self._jobs.values())
+
+    def sync(self, job, force=False):
+        """Publish job state to other processes (no-op here)."""
+
+    def merge_remote(self):
+        """Fold in what other processes wrote for our jobs; returns the jobs that changed (none here)."""
+        return []
+
+    def prune(self, before):
+        """Drop jobs abandoned by other processes; returns their temp dirs (none here)."""
+        return []
+
+    def describe(self):
+        return {"backend": self.backend, "local_jobs": len(self._jobs)}
+
+
+class SqliteJobStore(MemoryJobStore):
+    """Live jobs stay in this process; their state is written through to a WAL-mode SQLite table.
+
+    Any worker can read any job from the table. Those reads return a snapshot Job that is
+    not registered locally; writes to a snapshot (e.g. /fetch) go back through sync().
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path, sync_interval=0.5):
+        super().__init__()
+        self.path = path
+        self.sync_interval = sync_interval
+        self._local = threading.local()
+        self._saved = {}  # job id -> (monotonic time, status, wall time) of the last write
+        self._merged_at = time.time()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __setitem__(self, job_id, job):
+        super().__setitem__(job_id, job)
+        self.sync(job, force=True)
+
+    def get(self, job_id, default=None):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        row = self._conn().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(record=json.loads(row[0])) if row else default
+
+    def pop(self, job_id, default=None):
+        job = self._jobs.pop(job_id, None)
+        self._saved.pop(job_id, None)
+        self._conn().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        return job if job is not None else default
+
+    def merge_remote(self):
+        # a /fetch served by another worker is written to our job's row; only rows written since
+        # the last merge, and after our own last write, can carry one
+        since, self._merged_at = self._merged_at, time.time()
+        rows = self._conn().execute(
+            "SELECT id, data, updated_at FROM jobs WHERE updated_at > ?", (since - 1,)
+        ).fetchall()
+        changed = []
+        for job_id, data, updated_at in rows:
+            job, saved = self._jobs.get(job_id), self._saved.get(job_id)
+            if job is None or saved is None or updated_at <= saved[2] or job.status != "finished":
+                continue
+            rec = json.loads(data)
+            if rec.get("downloaded_at") and not job.downloaded_at:
+                job.status = rec.get("status", job.status)
+                job.downloaded_at = rec["downloaded_at"]
+                changed.append(job)
+        return changed
+
+    def sync(self, job, force=False):
+        now = time.monotonic()
+        last = self._saved.get(job.id)
+        if not force and last and last[1] == job.status and now - last[0] < self.sync_interval:
+            return
+        wall = time.time()
+        self._saved[job.id] = (now, job.status, wall)
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO jobs (id, data, updated_at) VALUES (?, ?, ?)",
+                (job.id, json.dumps(job.to_record()), wall),
+            )
+        except sqlite3.Error as e:
+            if DEBUG_LOG:
+                print(f"[jobs] sync {job.id} failed: {repr(e)}")
+
+    def prune(self, before):
+        conn = self._conn()
+        rows = conn.execute("SELECT id, data FROM jobs WHERE updated_at < ?", (before,)).fetchall()
+        dirs = []
+        for job_id, data in rows:
+            if job_id in self._jobs:
+                continue
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            tmp = json.loads(data).get("tmp")
+            if tmp:
+                dirs.append(tmp)
+        return dirs
+
+    def describe(self):
+        return {**super().describe(), "path": self.path}
+
+
+def _make_job_store():
+    if JOB_STORE == "sqlite":
+        try:
+            return SqliteJobStore(JOB_STORE_PATH, JOB_STORE_SYNC_SECONDS)
+        except Exception as e:
+            print(f"[jobs] sqlite store unavailable ({repr(e)}), using memory")
+    return MemoryJobStore()
+
+
+JOBS = _make_job_store()
 JOBS_LOCK = threading.Lock()
 
 
-class Job:
+def _expiry_deadline(job):
+    """Wall-clock time at which a job and its files may be dropped, or None while it is still live."""
+    deadlines = []
+    if job.status in ("finished", "error"):
+        deadlines.append(job.created_at + JOB_TTL_SECONDS)
+    if job.status == "error":
+        # the page shows the error on its next poll; keeping failures for the full TTL lets junk fill MAX_JOBS
+        deadlines.append(job.created_at + (job.timings or {}).get("done", 0) + ERROR_KEEP_SECONDS)
+    # a progressive fetch may complete before the job leaves "finished"
+    if job.status in ("downloaded", "finished") and job.downloaded_at:
+        deadlines.append(job.downloaded_at + DOWNLOAD_KEEP_SECONDS)
+    if not deadlines:
+        return None
+    if job.snapshot:
+        # another worker's job: give its owner a couple of merge_remote rounds to drop it first
+        return min(deadlines) + 2 * JOB_STORE_MERGE_SECONDS
+    return min(deadlines)
+
+
+class ExpiryScheduler:
+    """Min-heap of job deadlines; a single thread drops each job when its deadline passes.
+
+    schedule() is called on every state change. Superseded heap entries are left in place
+    and skipped when they surface, so rescheduling is O(log n) and nothing scans JOBS.
+    """
+
     def __init__(self):
-        self.id = str(uuid.uuid4())
-        self.tmp = Path(tempfile.mkdtemp(prefix="mvd_"))
+        self._heap = []  # (deadline, seq, job id)
+        self._due = {}  # job id -> (deadline, job) for the entry that counts
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.expired = 0
+
+    def schedule(self, job):
+        deadline = _expiry_deadline(job)
+        if deadline is None and job.id not in self._due:
+            return
+        with self._cond:
+            if deadline is None:
+                self._due.pop(job.id, None)
+                return
+            current = self._due.get(job.id)
+            self._due[job.id] = (deadline, job)
+            if current is not None and current[0] == deadline:
+                return
+            self._seq += 1
+            heapq.heappush(self._heap, (deadline, self._seq, job.id))
+            if self._heap[0][2] == job.id:
+                self._cond.notify()
+
+    def cancel(self, job_id):
+        with self._cond:
+            self._due.pop(job_id, None)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, job_id = heapq.heappop(self._heap)
+            entry = self._due.get(job_id)
+            if entry is not None and entry[0] == deadline:
+                del self._due[job_id]
+                due.append(entry[1])
+        # stale entries pile up when jobs are rescheduled a lot; rebuild from the live set
+        if len(self._heap) > 2 * len(self._due) + 1024:
+            self._heap = [(d, i, jid) for i, (jid, (d, _)) in enumerate(self._due.items())]
+            heapq.heapify(self._heap)
+        return due
+
+    def run(self):
+        next_sweep = time.time() + CLEANUP_INTERVAL
+        # with a shared store our jobs may be fetched through other workers, who cannot expire them
+        merge_every = JOB_STORE_MERGE_SECONDS if JOBS.backend == "sqlite" else None
+        next_merge = time.time() + merge_every if merge_every else float("inf")
+        while True:
+            if time.time() >= next_merge:
+                next_merge = time.time() + merge_every
+                try:
+                    for job in JOBS.merge_remote():
+                        self.schedule(job)
+                except Exception as e:
+                    if DEBUG_LOG:
+                        print("[cleanup] merge error:", repr(e))
+            with self._cond:
+                now = time.time()
+                due = self._pop_due(now)
+                if not due and now < next_sweep:
+                    wake = min(next_sweep, next_merge)
+                    if self._heap:
+                        wake = min(wake, self._heap[0][0])
+                    self._cond.wait(max(0.05, wake - now))
+                    continue
+            for job in due:
+                try:
+                    self._expire(job)
+                except Exception as e:
+                    if DEBUG_LOG:
+                        print("[cleanup] error:", repr(e))
+            if now >= next_sweep:
+                next_sweep = now + CLEANUP_INTERVAL
+                try:
+                    # jobs left in the shared store by workers that went away
+                    for tmp in JOBS.prune(now - 2 * JOB_TTL_SECONDS):
+                        shutil.rmtree(tmp, ignore_errors=True)
+                except Exception as e:
+                    if DEBUG_LOG:
+                        print("[cleanup] error:", repr(e))
+
+    def _expire(self, job):
+        deadline = _expiry_deadline(job)
+        if deadline is None or deadline > time.time():
+            # changed without passing through _notify (e.g. fetched from another worker)
+            self.schedule(job)
+            return
+        j = JOBS.pop(job.id, None)
+        self.expired += 1
+        if DEBUG_LOG:
+            print(f"[cleanup] expired job {job.id} status={job.status}")
+        if job.snapshot:
+            # another worker's job (we served its /fetch): its files and _DIR_REFS live over
+            # there, and the owner drops them once merge_remote sees the fetch; only the row is ours
+            return
+        _discard_job(j or job)
+
+    def stats(self):
+        with self._cond:
+            nxt = self._heap[0][0] - time.time() if self._heap else None
+            return {"scheduled": len(self._due), "heap": len(self._heap), "expired": self.expired,
+                    "next_in_seconds": round(nxt, 1) if nxt is not None else None}
+
+
+EXPIRY = ExpiryScheduler()
+
+
+class Job:
+    """One download request. Slotted, with its temp dir and condition created on first use,
+    so a flood of queued jobs costs a few hundred bytes each."""
+
+    # state shared with other workers through the job store
+    RECORD_FIELDS = (
+        "id", "percent", "status", "file", "error", "speed_bytes", "created_at", "downloaded_at",
+        "total_bytes", "downloaded_bytes", "download_name", "streamable", "stream_path", "stream_final",
+        "stream_done", "stream_size", "stage", "version", "timings", "children", "parent",
+    )
+    __slots__ = RECORD_FIELDS + (
+        "_tmp", "_cond", "_speed_ring", "_speed_idx", "_mono0", "meta", "filename", "dedupe_key", "leader",
+        "followers", "snapshot", "queue", "journaled", "owner", "requeue",
+    )
+
+    def __init__(self, record=None, job_id=None, tmp=None):
+        if record is None:
+            self.id = job_id or str(uuid.uuid4())
+            self._tmp = None
+            if tmp:
+                # recovered job: reuse its temp dir so yt-dlp can resume the .part files
+                self._tmp = Path(tmp)
+                self._tmp.mkdir(parents=True, exist_ok=True)
+        else:
+            self.id = record["id"]
+            self._tmp = Path(record["tmp"]) if record.get("tmp") else None
         self.percent = 0
         self.status = "queued"
         self.file = None
@@ -1002,7 +1588,751 @@ class Job:
         self.downloaded_at = None
         self.total_bytes = 0
         self.downloaded_bytes = 0
-        JOBS[self.id] = self
+        self.download_name = None  # served filename when it differs from the file on disk
+        self.meta = None  # small info subset used to name shared/cached outputs
+        self.filename = None  # requested filename template
+        self.dedupe_key = None
+        self.leader = None  # job doing the actual download when this one is coalesced
+        self.followers = ()
+        self.streamable = False  # single-stream output that can be sent while downloading
+        self.stream_path = None  # file yt-dlp is writing (.part), then its final name
+        self.stream_final = None
+        self.stream_done = False
+        self.stream_size = None  # exact size of the streamed file when the server announced one
+        self.stage = "queued"  # queued -> download -> [postprocess_queued -> postprocess] -> done
+        self.version = 0  # bumped on every progress/state change, used as the SSE event id
+        self.timings = None  # phase -> seconds since created_at, see mark()
+        self.children = None  # batch parent: ids of its entry jobs, in playlist order
+        self.parent = None  # batch entry: id of the parent job
+        self._mono0 = None
+        self._cond = None
+        self._speed_ring = None
+        self._speed_idx = 0
+        self.snapshot = record is not None  # read from the job store, owned by another worker
+        self.queue = None  # queue fields as last published by the owning worker
+        self.journaled = None  # last status written to the job journal; None if not journaled
+        self.owner = None  # address counted in CLIENT_JOBS for this job
+        self.requeue = None  # queues the job for run_download again (set by _enqueue_job)
+        if record is None:
+            JOBS[self.id] = self
+        else:
+            for k in self.RECORD_FIELDS:
+                setattr(self, k, record.get(k, getattr(self, k)))
+            self.queue = record.get("queue")
+
+    @property
+    def tmp(self) -> Path:
+        """The job's temp dir, created the first time anything needs it (i.e. when it starts)."""
+        if self._tmp is None:
+            with _LAZY_LOCK:
+                if self._tmp is None:
+                    TEMP_ROOT.mkdir(exist_ok=True)
+                    self._tmp = Path(tempfile.mkdtemp(prefix="mvd_", dir=TEMP_ROOT))
+        return self._tmp
+
+    @property
+    def cond(self) -> threading.Condition:
+        if self._cond is None:
+            with _LAZY_LOCK:
+                if self._cond is None:
+                    self._cond = threading.Condition()
+        return self._cond
+
+    def add_speed_sample(self, speed):
+        """Record a hook speed reading; speed_bytes becomes the mean of the last SPEED_SAMPLES."""
+        ring = self._speed_ring
+        if ring is None:
+            ring = self._speed_ring = array("d", bytes(8 * SPEED_SAMPLES))
+        ring[self._speed_idx % SPEED_SAMPLES] = speed
+        self._speed_idx += 1
+        filled = min(self._speed_idx, SPEED_SAMPLES)
+        self.speed_bytes = sum(ring) / filled
+
+    def mark(self, phase, at=None):
+        """Stamp ``phase`` (first stamp wins) as monotonic seconds since the job was created."""
+        if self._mono0 is None:
+            self._mono0 = time.monotonic() - max(0.0, time.time() - self.created_at)
+        if self.timings is None:
+            self.timings = {}
+        if phase not in self.timings:
+            self.timings[phase] = round((time.monotonic() if at is None else at) - self._mono0, 3)
+
+    def to_record(self) -> dict:
+        rec = {k: getattr(self, k) for k in self.RECORD_FIELDS}
+        rec["tmp"] = str(self._tmp) if self._tmp else None
+        rec["queue"] = _queue_fields(self)
+        return rec
+
+
+_LAZY_LOCK = threading.Lock()
+
+
+def _wake(job: Job):
+    cond = job._cond
+    if cond is None:
+        # nobody has waited on this job yet, so there is no one to wake
+        job.version += 1
+    else:
+        with cond:
+            job.version += 1
+            cond.notify_all()
+
+
+def _notify(job: Job):
+    _wake(job)
+    if job.parent is not None:
+        # the parent's aggregate progress is computed on read; just wake its SSE streams
+        parent = JOBS.get(job.parent)
+        if parent is not None and not parent.snapshot:
+            _wake(parent)
+    JOBS.sync(job)
+    if job.journaled is not None and job.journaled != job.status:
+        JOURNAL.state(job)
+    EXPIRY.schedule(job)
+
+
+def _refresh(job: Job) -> Job:
+    """Re-read a snapshot job from the shared store; live jobs are returned as-is."""
+    if not job.snapshot:
+        return job
+    return JOBS.get(job.id) or job
+
+
+# Temp dirs shared between coalesced jobs are reference counted; the owning job holds
+# an implicit reference so unshared dirs never appear here.
+_DIR_REFS = {}
+_DIR_REFS_LOCK = threading.Lock()
+
+
+def _retain_dir(path):
+    key = str(path)
+    with _DIR_REFS_LOCK:
+        _DIR_REFS[key] = _DIR_REFS.get(key, 1) + 1
+
+
+def _release_dir(path):
+    key = str(path)
+    with _DIR_REFS_LOCK:
+        n = _DIR_REFS.get(key, 1) - 1
+        if n > 0:
+            _DIR_REFS[key] = n
+            return
+        _DIR_REFS.pop(key, None)
+    shutil.rmtree(key, ignore_errors=True)
+    DISK.release(key)
+
+
+# (name, from phase, to phase) spans reported in the per-job timing line
+_PHASE_SPANS = (
+    ("queue", "queued", "extract_start"),
+    ("extract", "extract_start", "extract_end"),
+    ("download", "download_start", "download_end"),
+    ("postprocess_wait", "postprocess_queued", "postprocess_start"),
+    ("postprocess", "postprocess_start", "postprocess_end"),
+    ("discovery", "discovery_start", "discovery_end"),
+    ("publish", "discovery_end", "publish_end"),
+    ("fetch_wait", "done", "first_fetch"),
+)
+
+
+def _phase_durations(timings) -> dict:
+    timings = timings or {}
+    return {name: round(timings[b] - timings[a], 3) for name, a, b in _PHASE_SPANS if a in timings and b in timings}
+
+
+def _log_job_timings(job: Job):
+    if not JOB_TIMING_LOG or job.snapshot:
+        return
+    print(json.dumps({
+        "event": "job_timings", "job": job.id, "status": job.status,
+        "error_reason": _error_reason(job.error) if job.status == "error" else None,
+        "shared": job.leader is not None, "bytes": job.total_bytes or job.downloaded_bytes,
+        "timings": job.timings or {}, "durations": _phase_durations(job.timings),
+    }, separators=(",", ":")), flush=True)
+
+
+def _discard_job(job: Job):
+    _log_job_timings(job)
+    _disown_job(job)
+    if job.journaled is not None:
+        JOURNAL.end(job)
+    if job._tmp is not None:
+        _release_dir(job._tmp)
+    if job.leader is not None:
+        _release_dir(job.leader.tmp)
+
+
+# ---------- Disk budget ----------
+class DiskBudgetError(Exception):
+    pass
+
+
+class DiskBudgetDeferred(DiskBudgetError):
+    """No room yet: the job gives back its download slot and is queued again once space frees up."""
+
+    def __init__(self, need):
+        super().__init__(f"waiting for {need} bytes of disk")
+        self.need = need
+
+
+def _dir_size(path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class DiskBudget:
+    """Space accounting for job temp dirs.
+
+    A download reserves its estimated footprint before any bytes are written; the
+    reservation is trimmed to the real size when the job completes and released when its
+    temp dir is removed. Fetched artifacts waiting out DOWNLOAD_KEEP_SECONDS are evicted
+    early (oldest fetch first) to make room. A job that does not fit gives up its download
+    slot (DiskBudgetDeferred) and is queued again when space frees up, for at most
+    ``wait_seconds``.
+    """
+
+    def __init__(self, budget, min_free, root, wait_seconds=DISK_WAIT_SECONDS):
+        self.budget = budget
+        self.min_free = min_free
+        self.root = root
+        self.wait_seconds = wait_seconds
+        self._held = {}  # temp dir -> [reserved bytes, job, bytes written so far]
+        self._deadlines = {}  # job id -> monotonic time its wait for space runs out
+        self._waiters = deque()  # (bytes, job, resume) for deferred jobs, oldest first
+        self._poller = None
+        self._cond = threading.Condition()
+        self.evictions = 0
+        self.rejected = 0
+
+    def _reserved(self):
+        return sum(h[0] for h in self._held.values())
+
+    def _free(self):
+        try:
+            free = shutil.disk_usage(self.root).free - self.min_free
+        except OSError:
+            free = float("inf")
+        # bytes already on disk are counted by disk_usage; only the unwritten part of a reservation is owed
+        owed = sum(max(0, n - written) for n, _, written in self._held.values())
+        room = free - owed
+        if self.budget:
+            room = min(room, self.budget - self._reserved())
+        return room
+
+    @staticmethod
+    def _evictable(job):
+        return bool(job.downloaded_at) and job.status in ("downloaded", "finished")
+
+    def _evict_for(self, need):
+        """Drop fetched jobs, oldest first, until ``need`` bytes fit; returns True if they do."""
+        with self._cond:
+            room = self._free()
+            if room >= need:
+                return True
+            fetched = sorted((h[1] for h in self._held.values() if self._evictable(h[1])), key=lambda j: j.downloaded_at)
+        for job in fetched:
+            if room >= need:
+                break
+            if JOBS.pop(job.id, None) is None:
+                continue
+            EXPIRY.cancel(job.id)
+            room += self._held.get(str(job._tmp), (0,))[0]
+            self.evictions += 1
+            if DEBUG_LOG:
+                print(f"[disk] evicting fetched job {job.id} to make room")
+            _discard_job(job)
+        with self._cond:
+            return self._free() >= need
+
+    def reserve(self, job, nbytes):
+        """Hold ``nbytes`` for job.tmp without waiting.
+
+        Raises DiskBudgetDeferred while the job may still wait for space, DiskBudgetError
+        once it never can or has waited ``wait_seconds``.
+        """
+        key = str(job.tmp)
+        if self.budget and nbytes > self.budget:
+            self.rejected += 1
+            raise DiskBudgetError(f"needs ~{nbytes // 1024 ** 2} MiB, more than the server's disk budget")
+        if self._evict_for(nbytes):
+            with self._cond:
+                if self._free() >= nbytes:
+                    self._held[key] = [nbytes, job, 0]
+                    self._deadlines.pop(job.id, None)
+                    return
+        with self._cond:
+            deadline = self._deadlines.setdefault(job.id, time.monotonic() + self.wait_seconds)
+            if time.monotonic() >= deadline:
+                del self._deadlines[job.id]
+                self.rejected += 1
+                raise DiskBudgetError("not enough disk space on the server, try again later")
+        raise DiskBudgetDeferred(nbytes)
+
+    def defer(self, job, nbytes, resume):
+        """Park a job that got DiskBudgetDeferred; ``resume()`` queues it again when it may fit."""
+        job.stage = "waiting_disk"
+        _mirror_progress(job)
+        _notify(job)
+        if DEBUG_LOG:
+            print(f"[disk] job {job.id} waiting for {nbytes} bytes")
+        with self._cond:
+            self._waiters.append((nbytes, job, resume))
+            if self._poller is None:
+                # space also frees up outside this process, and waits run out
+                self._poller = threading.Thread(target=self._poll, name="disk-waiters", daemon=True)
+                self._poller.start()
+        self._wake()
+
+    def _poll(self):
+        while True:
+            time.sleep(5)
+            try:
+                self._wake()
+            except Exception as e:
+                if DEBUG_LOG:
+                    print("[disk] error:", repr(e))
+
+    def _wake(self):
+        """Resume deferred jobs that fit now (smaller ones may pass larger ones) or have waited long enough."""
+        ready = []
+        with self._cond:
+            if not self._waiters:
+                return
+            # reserve() evicts fetched jobs, so their space counts as free here
+            room = self._free() + sum(n for n, job, _ in self._held.values() if self._evictable(job))
+            now = time.monotonic()
+            waiting = deque()
+            for nbytes, job, resume in self._waiters:
+                if nbytes <= room:
+                    room -= nbytes
+                    ready.append(resume)
+                elif now >= self._deadlines.get(job.id, 0):
+                    ready.append(resume)  # reserve() fails it for good on this run
+                else:
+                    waiting.append((nbytes, job, resume))
+            self._waiters = waiting
+        for resume in ready:
+            resume()
+
+    def wrote(self, job, nbytes):
+        """Progress hook: ``nbytes`` more of the job's reservation are now on disk."""
+        if job._tmp is None:
+            return
+        with self._cond:
+            held = self._held.get(str(job._tmp))
+            if held is not None:
+                held[2] += nbytes
+
+    def settle(self, job):
+        """Trim a finished job's reservation to what its temp dir actually holds."""
+        key = str(job._tmp) if job._tmp is not None else None
+        if key is None or key not in self._held:
+            return
+        size = _dir_size(key)
+        with self._cond:
+            held = self._held.get(key)
+            if held is None:
+                return
+            held[0] = held[2] = size
+        self._wake()
+
+    def track(self, job):
+        """Account for a job whose files are already on disk (recovered after a restart)."""
+        if job._tmp is None:
+            return
+        size = _dir_size(job._tmp)
+        with self._cond:
+            self._held[str(job._tmp)] = [size, job, size]
+
+    def release(self, path):
+        with self._cond:
+            released = self._held.pop(str(path), None) is not None
+        if released:
+            self._wake()
+
+    def stats(self):
+        with self._cond:
+            return {"budget_bytes": self.budget, "reserved_bytes": self._reserved(), "jobs": len(self._held),
+                    "waiting": len(self._waiters), "evictions": self.evictions, "rejected": self.rejected}
+
+
+DISK = DiskBudget(DISK_BUDGET_BYTES, DISK_MIN_FREE_BYTES, tempfile.gettempdir())
+
+
+def _disk_estimate(info: dict, converts: bool) -> int:
+    """Bytes a download is expected to occupy in job.tmp, including merge/convert copies."""
+    formats = info.get("requested_formats") or [info]
+    total = 0
+    for f in formats:
+        size = f.get("filesize") or f.get("filesize_approx")
+        if not size and f.get("tbr") and info.get("duration"):
+            size = f["tbr"] * 125 * info["duration"]  # kbit/s -> bytes
+        if not size:
+            return DISK_JOB_ESTIMATE_BYTES
+        total += size
+    if converts or len(formats) > 1:
+        # the merged / converted output coexists with its inputs until they are deleted
+        total *= 2
+    return int(total * 1.1)
+
+
+def _disk_reserve_pp_class(PostProcessor):
+    class _DiskReservePP(PostProcessor):
+        """before_dl step: reserve disk for the selected formats, or defer / fail the job."""
+
+        def __init__(self, job, downloader=None):
+            super().__init__(downloader)
+            self.job = job
+
+        def run(self, info):
+            converts = bool(self._downloader and self._downloader._pps["post_process"])
+            need = _disk_estimate(info, converts)
+            if DEBUG_LOG:
+                print(f"[disk] job {self.job.id} reserving {need} bytes")
+            DISK.reserve(self.job, need)
+            return [], info
+
+    return _DiskReservePP
+
+
+# ---------- Bandwidth ----------
+def _read_rate_limit_live(FileDownloader):
+    """Make every downloader take ``ratelimit`` from its YoutubeDL on each block.
+
+    HttpFD shares the YoutubeDL's params, but FragmentFD (HLS/DASH) fetches through a
+    downloader built on a copy taken when the format starts, which would pin the share
+    GOVERNOR gave it at that moment.
+    """
+    slow_down = FileDownloader.slow_down
+
+    def live_slow_down(self, start_time, now, byte_counter):
+        params = getattr(self.ydl, "params", None)
+        if params is not None and params is not self.params:
+            self.params["ratelimit"] = params.get("ratelimit")
+        return slow_down(self, start_time, now, byte_counter)
+
+    FileDownloader.slow_down = live_slow_down
+
+
+class BandwidthGovernor:
+    """Splits BANDWIDTH_LIMIT_BYTES between running downloads.
+
+    Each download stage registers its YoutubeDL; once a second (and whenever a job or a
+    /fetch transfer starts or stops) the ingress budget is divided max-min fairly and
+    written to every instance's ``ratelimit`` param, which every downloader, fragment
+    ones included, reads per block (see _read_rate_limit_live). While files are being
+    delivered, DELIVERY_HEADROOM of the link is held back.
+    """
+
+    MIN_SHARE = 16 * 1024
+
+    def __init__(self, limit, headroom):
+        self.limit = limit
+        self.headroom = headroom
+        self._ydls = {}  # job id -> (job, YoutubeDL)
+        self._alloc = {}
+        self._deliveries = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.limit > 0
+
+    def ingress(self):
+        if self._deliveries:
+            return int(self.limit * (1 - self.headroom))
+        return self.limit
+
+    def register(self, job, ydl):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ydls[job.id] = (job, ydl)
+        self.rebalance()
+
+    def unregister(self, job):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ydls.pop(job.id, None)
+        self.rebalance()
+
+    def delivery_started(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._deliveries += 1
+        self.rebalance()
+
+    def delivery_finished(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._deliveries = max(0, self._deliveries - 1)
+        self.rebalance()
+
+    def rebalance(self):
+        with self._lock:
+            remaining = self.ingress()
+            # jobs using well under an equal share keep what they use plus room to grow;
+            # whatever they leave is split between the rest
+            pending = {jid: job.speed_bytes for jid, (job, _) in self._ydls.items()}
+            alloc = {}
+            while pending:
+                equal = remaining / len(pending)
+                light = {jid: speed * 1.25 for jid, speed in pending.items() if speed and speed * 1.25 < equal}
+                if not light:
+                    for jid in pending:
+                        alloc[jid] = equal
+                    break
+                for jid, share in light.items():
+                    alloc[jid] = share
+                    remaining -= share
+                    del pending[jid]
+            self._alloc = {jid: max(self.MIN_SHARE, int(share)) for jid, share in alloc.items()}
+            for jid, (_, ydl) in self._ydls.items():
+                # fragment downloaders apply the limit to each connection
+                ydl.params["ratelimit"] = max(1, self._alloc[jid] // getattr(ydl, "fragment_connections", 1))
+
+    def run(self):
+        while True:
+            time.sleep(1)
+            try:
+                if self._ydls:
+                    self.rebalance()
+            except Exception as e:
+                if DEBUG_LOG:
+                    print("[bandwidth] error:", repr(e))
+
+    def stats(self):
+        with self._lock:
+            return {"limit_bytes": self.limit, "ingress_bytes": self.ingress() if self.enabled else None,
+                    "deliveries": self._deliveries, "allocations": dict(self._alloc)}
+
+
+GOVERNOR = BandwidthGovernor(BANDWIDTH_LIMIT_BYTES, DELIVERY_HEADROOM)
+if GOVERNOR.enabled:
+    threading.Thread(target=GOVERNOR.run, name="bandwidth", daemon=True).start()
+
+
+# ---------- Fragment concurrency ----------
+_FRAGMENTED_PROTOCOLS = ("m3u8_native", "http_dash_segments", "http_dash_segments_generator", "ism", "f4m")
+
+
+class FragmentGovernor:
+    """Chooses concurrent_fragment_downloads for each HLS/DASH format download.
+
+    Limits are learned per host with AIMD: a format that keeps its per-connection
+    throughput earns the host one more connection next time, an HTTP 429/5xx halves it.
+    Leases never exceed FRAGMENT_CONNECTIONS_MAX across all jobs (each download gets at
+    least one connection).
+    """
+
+    MAX_HOSTS = 256
+
+    def __init__(self, start, ceiling, cap):
+        self.start = max(1, start)
+        self.ceiling = max(self.start, ceiling)
+        self.cap = max(1, cap)
+        self.in_use = 0
+        self.backoffs = 0
+        self._hosts = OrderedDict()  # host -> {"limit", "per_conn"}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        st = self._hosts.get(host)
+        if st is None:
+            st = self._hosts[host] = {"limit": self.start, "per_conn": None}
+            while len(self._hosts) > self.MAX_HOSTS:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return st
+
+    def lease(self, host) -> int:
+        with self._lock:
+            n = max(1, min(self._host(host)["limit"], self.cap - self.in_use))
+            self.in_use += n
+            return n
+
+    def release(self, n):
+        with self._lock:
+            self.in_use = max(0, self.in_use - n)
+
+    def observe(self, host, n, nbytes, elapsed):
+        """Feed back one finished format download made with ``n`` connections."""
+        if not nbytes or elapsed <= 0:
+            return
+        per_conn = nbytes / elapsed / n
+        with self._lock:
+            st = self._host(host)
+            prev = st["per_conn"]
+            if prev is None or per_conn >= 0.8 * prev:
+                # throughput per connection held, so the extra connections paid off
+                if n >= st["limit"]:
+                    st["limit"] = min(self.ceiling, st["limit"] + 1)
+            elif per_conn < 0.5 * prev:
+                st["limit"] = max(1, st["limit"] - 1)
+            st["per_conn"] = per_conn if prev is None else 0.5 * (prev + per_conn)
+
+    def backoff(self, host):
+        with self._lock:
+            st = self._hosts.get(host)
+            if st is None:
+                return
+            st["limit"] = max(1, st["limit"] // 2)
+            st["per_conn"] = None
+            self.backoffs += 1
+        if DEBUG_LOG:
+            print(f"[fragments] {host} throttling, limit now {st['limit']}")
+
+    def tracks(self, host):
+        return host in self._hosts
+
+    def stats(self):
+        with self._lock:
+            return {"in_use": self.in_use, "cap": self.cap, "backoffs": self.backoffs,
+                    "hosts": {h: st["limit"] for h, st in self._hosts.items()}}
+
+
+FRAGMENTS = FragmentGovernor(FRAGMENT_CONCURRENCY_START, FRAGMENT_CONCURRENCY_MAX, FRAGMENT_CONNECTIONS_MAX)
+
+
+def _fragment_host(info: dict) -> str:
+    return urlsplit(info.get("fragment_base_url") or info.get("url") or "").hostname or ""
+
+
+# ---------- Job journal ----------
+class JobJournal:
+    """Append-only JSON-lines log of job parameters and state transitions.
+
+    Records are ``start`` (parameters + temp dir), ``state`` (status changes) and ``end``
+    (job discarded). Writers and compaction serialize on ``<path>.lock``; every gunicorn
+    worker also holds a shared lock on ``<path>.alive`` so recovery only runs on a cold start.
+    A worker compacts the log once it has appended ``compact_after`` records that a
+    compaction would drop (each ``state`` folds into its start, each ``end`` removes a job).
+    """
+
+    def __init__(self, path, compact_after=JOURNAL_COMPACT_RECORDS):
+        self.path = path
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._alive = None
+        self._dead = 0  # records appended by this worker since its last compaction that compaction drops
+        self.compactions = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @contextmanager
+    def exclusive(self):
+        with self._lock, open(self.path + ".lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            yield
+
+    def append(self, rec, sync=False):
+        if not self.enabled:
+            return
+        line = json.dumps(rec, separators=(",", ":")) + "\n"
+        try:
+            with self.exclusive():
+                # reopened per write so appends follow the file across compaction
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                    f.flush()
+                    if sync:
+                        os.fsync(f.fileno())
+                self._dead += {"state": 1, "end": 2}.get(rec["op"], 0)
+                if self.compact_after and self._dead >= self.compact_after:
+                    self._dead = 0
+                    self.rewrite(self.read())
+                    self.compactions += 1
+                    if DEBUG_LOG:
+                        print("[journal] compacted")
+        except OSError as e:
+            if DEBUG_LOG:
+                print("[journal] append failed:", repr(e))
+
+    def start(self, job: Job, params: dict):
+        job.journaled = job.status
+        self.append({
+            "op": "start", "id": job.id, "tmp": str(job._tmp) if job._tmp else None, "created_at": job.created_at,
+            "status": job.status, **params,
+        }, sync=True)
+
+    def state(self, job: Job):
+        job.journaled = job.status
+        rec = {"op": "state", "id": job.id, "status": job.status}
+        if job._tmp is not None:
+            rec["tmp"] = str(job._tmp)
+        if job.status == "finished":
+            rec["file"] = job.file
+            rec["download_name"] = job.download_name
+        self.append(rec)
+
+    def end(self, job: Job):
+        job.journaled = None
+        self.append({"op": "end", "id": job.id})
+
+    def read(self) -> dict:
+        """Fold the log into {job id: latest record} for jobs that have not ended."""
+        jobs = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn tail from a crash
+                    jid = rec.get("id")
+                    op = rec.pop("op", None)
+                    if op == "start":
+                        jobs[jid] = rec
+                    elif op == "state" and jid in jobs:
+                        jobs[jid].update(rec)
+                    elif op == "end":
+                        jobs.pop(jid, None)
+        except FileNotFoundError:
+            pass
+        return jobs
+
+    def rewrite(self, jobs: dict):
+        """Replace the log with one start record per surviving job (call under exclusive())."""
+        tmp = f"{self.path}.{uuid.uuid4().hex}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in jobs.values():
+                f.write(json.dumps({"op": "start", **rec}, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def claim_cold_start(self) -> bool:
+        """True if no other live worker is using the journal; every caller ends up holding a shared lock."""
+        self._alive = open(self.path + ".alive", "a")
+        try:
+            fcntl.flock(self._alive, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            fcntl.flock(self._alive, fcntl.LOCK_SH)
+            return False
+
+    def release_cold_start(self):
+        if self._alive is not None:
+            fcntl.flock(self._alive, fcntl.LOCK_SH)
+
+
+JOURNAL = JobJournal(JOB_JOURNAL_PATH)
+# job temp dirs live in one dir per journal, so recovery sweeps only what its own workers made
+TEMP_ROOT = Path(tempfile.gettempdir()) / (
+    "mvd-" + hashlib.sha1(os.path.abspath(JOB_JOURNAL_PATH).encode() if JOB_JOURNAL_PATH else b"").hexdigest()[:12]
+)
 
 
 URL_RE = re.compile(r"^https?://", re.I)
@@ -1039,7 +2369,397 @@ def _build_video_format(video_res):
     return "/".join(parts)
 
 
-executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT)
+# ---------- Scheduler ----------
+class _Task:
+    __slots__ = ("fn", "args", "client", "priority", "job", "enqueued_at")
+
+    def __init__(self, fn, args, client, priority, job):
+        self.fn = fn
+        self.args = args
+        self.client = client
+        self.priority = priority
+        self.job = job
+        self.enqueued_at = time.monotonic()
+
+
+class FairScheduler:
+    """Fixed worker pool that serves priority classes in order and clients round-robin inside a class.
+
+    Lower priority numbers run first. One client queueing many jobs only gets one turn per round,
+    so everyone else keeps moving.
+    """
+
+    def __init__(self, workers, name="download"):
+        self.workers = max(1, workers)
+        self.name = name
+        self._cond = threading.Condition()
+        self._classes = {}  # priority -> OrderedDict(client -> deque of _Task), in rotation order
+        self._queued = {}  # job id -> _Task
+        self._running = 0
+        self._durations = deque(maxlen=50)
+        self.completed = 0
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, client="", priority=1, job=None):
+        task = _Task(fn, args, client, priority, job)
+        with self._cond:
+            queues = self._classes.setdefault(priority, OrderedDict())
+            queues.setdefault(client, deque()).append(task)
+            if job is not None:
+                self._queued[job.id] = task
+            self._cond.notify()
+        return task
+
+    def _next(self):
+        for prio in sorted(self._classes):
+            queues = self._classes[prio]
+            if not queues:
+                continue
+            client, q = next(iter(queues.items()))
+            task = q.popleft()
+            # rotate the client to the back of its class
+            del queues[client]
+            if q:
+                queues[client] = q
+            if task.job is not None:
+                self._queued.pop(task.job.id, None)
+            return task
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next()
+                self._running += 1
+            start = time.monotonic()
+            try:
+                task.fn(*task.args)
+            except Exception as e:
+                if DEBUG_LOG:
+                    print(f"[{self.name}] task failed: {repr(e)}")
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self.completed += 1
+                    self._durations.append(time.monotonic() - start)
+
+    def queued_for(self, addr):
+        """Waiting jobs of every client key under ``addr`` (see _client_key)."""
+        with self._cond:
+            return sum(len(q) for queues in self._classes.values()
+                       for client, q in queues.items() if client.split("#", 1)[0] == addr)
+
+    def _avg_duration(self):
+        return (sum(self._durations) / len(self._durations)) if self._durations else JOB_ESTIMATE_SECONDS
+
+    def position(self, job):
+        """(1-based queue position, estimated seconds until start) for a queued job, else None."""
+        with self._cond:
+            task = self._queued.get(job.id)
+            if task is None:
+                return None
+            ahead = 0
+            for prio in sorted(self._classes):
+                queues = self._classes[prio]
+                if prio < task.priority:
+                    ahead += sum(len(q) for q in queues.values())
+                    continue
+                if prio > task.priority:
+                    break
+                mine = queues.get(task.client) or deque()
+                idx = next((i for i, t in enumerate(mine) if t is task), len(mine))
+                ahead += idx
+                before = True
+                for client, q in queues.items():
+                    if client == task.client:
+                        before = False
+                        continue
+                    # clients ahead in the rotation get one extra turn before ours comes up
+                    ahead += min(len(q), idx + 1 if before else idx)
+            busy = self._running + ahead
+            if busy < self.workers:
+                eta = 0
+            else:
+                waves = (busy - self.workers) // self.workers + 1
+                eta = int(self._avg_duration() * (waves - 0.5))
+            return ahead + 1, max(0, eta)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "completed": self.completed,
+                "queued": sum(len(q) for queues in self._classes.values() for q in queues.values()),
+                "avg_job_seconds": round(self._avg_duration(), 1),
+            }
+
+
+def _client_addr():
+    """Peer address; behind TRUSTED_PROXIES, ProxyFix has already swapped in the client's."""
+    return request.remote_addr or ""
+
+
+def _client_key():
+    """Fair-queueing key: the address, split by X-Client-Token for users sharing one address.
+
+    Limits are applied per address (everything before the '#'), so fresh tokens buy no extra room.
+    """
+    token = request.headers.get("X-Client-Token", "").strip()
+    addr = _client_addr()
+    return f"{addr}#{token[:64]}" if token else addr
+
+
+CLIENT_JOBS = {}  # address -> jobs it started that are still tracked, see MAX_JOBS_PER_CLIENT
+
+
+def _admit_client(addr):
+    """Error response when ``addr`` may not start another job right now, else None."""
+    if len(JOBS) >= MAX_JOBS:
+        return jsonify({"error": "Server busy, try again later"}), 503
+    if CLIENT_JOBS.get(addr, 0) >= MAX_JOBS_PER_CLIENT:
+        return jsonify({"error": "Too many recent jobs, try again later"}), 429
+    if executor.queued_for(addr) >= MAX_QUEUED_PER_CLIENT:
+        return jsonify({"error": "Too many queued jobs, wait for some to finish"}), 429
+    return None
+
+
+def _own_job(job, addr):
+    job.owner = addr
+    with JOBS_LOCK:
+        CLIENT_JOBS[addr] = CLIENT_JOBS.get(addr, 0) + 1
+
+
+def _disown_job(job):
+    if job.owner is None:
+        return
+    with JOBS_LOCK:
+        left = CLIENT_JOBS.get(job.owner, 0) - 1
+        if left > 0:
+            CLIENT_JOBS[job.owner] = left
+        else:
+            CLIENT_JOBS.pop(job.owner, None)
+    job.owner = None
+
+
+def _job_priority(fmt_key: str, video_res=None):
+    """0 = audio, 1 = single stream or <=720p video, 2 = high-res merges."""
+    if fmt_key == "audio":
+        return 0
+    res = _to_int(video_res)
+    if not has_ffmpeg() or (res and res <= 720):
+        return 1
+    return 2
+
+
+executor = FairScheduler(MAX_CONCURRENT)
+postprocess_pool = FairScheduler(POSTPROCESS_WORKERS, name="postprocess")
+
+
+# ---------- Metadata cache (/info) ----------
+_TRACKING_PARAMS = {"si", "feature", "pp", "fbclid", "gclid", "igshid", "ab_channel"}
+_YT_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be", "youtube-nocookie.com"}
+
+
+def normalize_url(url: str) -> str:
+    """Cache key for a URL: YouTube links collapse to the video id, others lose tracking noise."""
+    try:
+        u = urlsplit((url or "").strip())
+        host = (u.hostname or "").lower()
+        port = u.port
+    except ValueError:
+        return (url or "").strip()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [
+        (k, v) for k, v in parse_qsl(u.query, keep_blank_values=True)
+        if k not in _TRACKING_PARAMS and not k.startswith("utm_")
+    ]
+    if host in _YT_HOSTS:
+        parts = [p for p in u.path.split("/") if p]
+        vid = None
+        if host == "youtu.be" and parts:
+            vid = parts[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "live", "embed"):
+            vid = parts[1]
+        else:
+            vid = dict(query).get("v")
+        if vid:
+            # same shape as the extractor id key, so URL and id lookups converge
+            return f"Youtube:{vid}"
+    netloc = f"{host}:{port}" if port else host
+    return urlunsplit((u.scheme.lower(), netloc, u.path or "/", urlencode(sorted(query)), ""))
+
+
+class _InfoEntry:
+    __slots__ = ("info", "error", "created_at", "expires_at", "size", "refs")
+
+    def __init__(self, info, error, ttl, size=0):
+        self.info = info
+        self.error = error
+        self.created_at = time.time()
+        self.expires_at = self.created_at + ttl
+        self.size = size  # estimated bytes, counted once however many keys point here
+        self.refs = 0
+
+
+class _InfoFlight:
+    __slots__ = ("done", "info", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.info = None
+        self.error = None
+
+
+class InfoCache:
+    """TTL + LRU cache of extracted info dicts with negative caching and single-flight extraction.
+
+    Bounded by key count and by ``max_bytes``, the summed JSON size of the cached dicts.
+    """
+
+    def __init__(self, ttl, negative_ttl, max_size, max_bytes=0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, max_size)
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._drop(self._data.pop(key))
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _drop(self, entry):
+        entry.refs -= 1
+        if not entry.refs:
+            self._bytes -= entry.size
+
+    def _store(self, keys, entry):
+        for k in keys:
+            old = self._data.get(k)
+            if old is not entry:
+                if old is not None:
+                    self._drop(old)
+                entry.refs += 1
+                if entry.refs == 1:
+                    self._bytes += entry.size
+            self._data[k] = entry
+            self._data.move_to_end(k)
+        # the newest entry stays even if it alone is over max_bytes
+        while len(self._data) > self.max_size or (
+            self.max_bytes and self._bytes > self.max_bytes and next(iter(self._data.values())) is not entry
+        ):
+            self._drop(self._data.popitem(last=False)[1])
+            self.evictions += 1
+
+    def peek(self, url):
+        """Return the cached (positive) entry for url without extracting, or None."""
+        with self._lock:
+            entry = self._lookup(normalize_url(url))
+        if entry is None or entry.error is not None:
+            return None
+        return entry
+
+    def get_or_extract(self, url, extract):
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                if entry.error is not None:
+                    self.negative_hits += 1
+                    raise entry.error.with_traceback(None)
+                self.hits += 1
+                return entry.info
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _InfoFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error.with_traceback(None)
+            return flight.info
+
+        size = 0
+        try:
+            flight.info = extract(url)
+            if self.max_bytes:
+                size = len(json.dumps(flight.info, default=str))
+        except Exception as e:
+            flight.error = e
+        with self._lock:
+            self._inflight.pop(key, None)
+            if flight.error is not None:
+                self._store([key], _InfoEntry(None, flight.error, self.negative_ttl))
+            else:
+                keys = [key]
+                info = flight.info or {}
+                if info.get("extractor_key") and info.get("id"):
+                    keys.append(f"{info['extractor_key']}:{info['id']}")
+                self._store(dict.fromkeys(keys), _InfoEntry(flight.info, None, self.ttl, size))
+        flight.done.set()
+        if flight.error is not None:
+            raise flight.error
+        return flight.info
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "inflight": len(self._inflight),
+            }
+
+
+INFO_CACHE = InfoCache(INFO_CACHE_TTL, INFO_CACHE_NEGATIVE_TTL, INFO_CACHE_SIZE, INFO_CACHE_BYTES)
+
+
+def _preview_profile():
+    return "preview", {"skip_download": True, "quiet": True, "noplaylist": True, "cookiefile": "cookies.txt"}
+
+
+# big per-language / per-size tables that neither /info nor a job reusing the result reads;
+# yt-dlp rebuilds ``thumbnails`` from ``thumbnail`` when the info is processed again
+_PREVIEW_DROP_FIELDS = ("automatic_captions", "subtitles", "requested_subtitles", "thumbnails", "heatmap")
+
+
+def _extract_preview(url):
+    with YDL_POOL.leased(*_preview_profile(), ytdlp().YoutubeDL) as y:
+        info = y.extract_info(url, download=False)
+    for k in _PREVIEW_DROP_FIELDS if info else ():
+        info.pop(k, None)
+    return info
 
 
 def _find_output_file(tmpdir: Path, prefix_base: str):
@@ -1052,49 +2772,796 @@ def _find_output_file(tmpdir: Path, prefix_base: str):
     return max(files, key=lambda p: p.stat().st_size)
 
 
-def _run_yt_dlp_extract(job: Job, opts: dict, url: str):
-    with YoutubeDL(opts) as y:
-        y.extract_info(url, download=True)
+_EXPIRE_RE = re.compile(r"[?&/]expire[=/](\d+)")
+
+
+def _format_urls_expire_at(info: dict):
+    """Earliest expiry timestamp embedded in the info's format URLs (YouTube style), or None."""
+    stamps = []
+    for f in info.get("formats") or [info]:
+        m = _EXPIRE_RE.search(f.get("url") or "")
+        if m:
+            stamps.append(int(m.group(1)))
+    return min(stamps) if stamps else None
+
+
+def _reusable_info(url: str):
+    """Unprocessed copy of a fresh /info extraction for url, or None if it is missing, stale or expiring."""
+    entry = INFO_CACHE.peek(url)
+    if entry is None or not entry.info:
+        return None
+    now = time.time()
+    if now - entry.created_at > INFO_REUSE_SECONDS:
+        return None
+    expire_at = _format_urls_expire_at(entry.info)
+    if expire_at is not None and expire_at - now < FORMAT_URL_MIN_TTL:
+        return None
+    # drop the preview's own format selection (requested_formats, ...) so the job selects afresh,
+    # as yt-dlp's --load-info-json does; sanitize_info copies, and only adds keys to our shallow copy
+    return ytdlp().YoutubeDL.sanitize_info(dict(entry.info), remove_private_keys=True)
+
+
+def _staged_youtube_dl_class(YoutubeDL, HTTPError):
+    class _StagedYoutubeDL(YoutubeDL):
+        """YoutubeDL that stops after the download and hands post-processing back to the caller.
+
+        Each deferred step is a zero-argument callable that runs the original post_process
+        (merge, audio extraction, fixups, final move) on this instance.
+        """
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.begin_job()
+
+        def begin_job(self):
+            """Forget the previous job's state; called by YDL_POOL on every lease."""
+            self.deferred = []
+            self.fragment_connections = 1
+            self.extracted_at = None
+
+        def process_info(self, info_dict):
+            # extraction and format selection are over once yt-dlp starts on the file itself
+            if self.extracted_at is None:
+                self.extracted_at = time.monotonic()
+            return super().process_info(info_dict)
+
+        def dl(self, name, info, subtitle=False, test=False):
+            if test or subtitle or info.get("protocol") not in _FRAGMENTED_PROTOCOLS:
+                return super().dl(name, info, subtitle, test)
+            # the fragment downloader reads these once per format, so each format gets a fresh lease
+            host = _fragment_host(info)
+            n = FRAGMENTS.lease(host)
+            self.params["concurrent_fragment_downloads"] = n
+            self.fragment_connections = n
+            GOVERNOR.rebalance()
+            # only bytes fetched now say anything about n: skip files already there, and discount a
+            # .part the fragment downloader resumes (it does so only with its .ytdl state file)
+            done = os.path.exists(name)
+            part = name if self.params.get("nopart") else name + ".part"
+            resumes = not done and self.params.get("continuedl", True) and os.path.isfile(name + ".ytdl")
+            resumed = os.path.getsize(part) if resumes and os.path.isfile(part) else 0
+            started = time.monotonic()
+            try:
+                result = super().dl(name, info, subtitle, test)
+            finally:
+                FRAGMENTS.release(n)
+                self.fragment_connections = 1
+            if not done and (result[0] if isinstance(result, tuple) else result) and os.path.exists(name):
+                FRAGMENTS.observe(host, n, max(0, os.path.getsize(name) - resumed), time.monotonic() - started)
+            return result
+
+        def urlopen(self, req):
+            try:
+                return super().urlopen(req)
+            except HTTPError as e:
+                if e.status == 429 or e.status >= 500:
+                    host = urlsplit(req if isinstance(req, str) else req.url).hostname or ""
+                    if FRAGMENTS.tracks(host):
+                        FRAGMENTS.backoff(host)
+                raise
+
+        def post_process(self, filename, info, files_to_move=None):
+            if not (info.get("__postprocessors") or self._pps["post_process"]):
+                return super().post_process(filename, info, files_to_move)
+            # process_video_result strips the fields it copied into info ('ext', 'title', ...) as soon
+            # as process_info returns, so the deferred run gets its own copy (__files_to_move included)
+            staged = dict(info)
+            self.deferred.append(functools.partial(YoutubeDL.post_process, self, filename, staged, files_to_move))
+            info["filepath"] = filename
+            return info
+
+
+    return _StagedYoutubeDL
+
+
+# ---------- YoutubeDL pool ----------
+class YoutubeDLPool:
+    """Idle YoutubeDL instances kept per option profile.
+
+    Building a YoutubeDL parses its options, registers ~1800 extractor classes and later
+    loads the cookie jar; a leased instance keeps all of that, plus its extractor
+    instances and open connections. A profile is a name plus the construction-time
+    options; per-job settings (format, outtmpl, progress_hooks) are applied on lease and
+    everything a job leaves behind is reset on release. Each instance serves one job at
+    a time and is rebuilt after ``max_uses`` jobs.
+    """
+
+    MAX_PROFILES = 16
+
+    def __init__(self, size: int, max_uses: int):
+        self.size = size
+        self.max_uses = max(1, max_uses)
+        self._idle = OrderedDict()  # profile key -> [YoutubeDL], least recently used first
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+
+    def lease(self, profile: str, opts: dict, cls, **overrides):
+        key = (profile, json.dumps(opts, sort_keys=True, default=repr))
+        y = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self._idle.move_to_end(key)
+                y = idle.pop()
+        if y is not None and not self._healthy(y):
+            self._retire(y)
+            y = None
+        if y is None:
+            y = cls(copy.deepcopy(opts))
+            y._pool_key = key
+            y._pool_uses = 0
+            y._pool_params = dict(y.params)
+            y._pool_pps = {when: list(pps) for when, pps in y._pps.items()}
+            self.created += 1
+        else:
+            self.reused += 1
+        y._pool_uses += 1
+        if "format" in overrides:
+            y.params["format"] = overrides["format"]
+            y.format_selector = y.build_format_selector(overrides["format"])
+        if "outtmpl" in overrides:
+            y.params["outtmpl"] = {"default": overrides["outtmpl"]}
+            y._parse_outtmpl()
+        for hook in overrides.get("progress_hooks") or ():
+            y.add_progress_hook(hook)
+        return y
+
+    def release(self, y, healthy: bool = True):
+        self._reset(y)
+        if not healthy or self.size <= 0 or y._pool_uses >= self.max_uses:
+            self._retire(y)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(y._pool_key, [])
+            self._idle.move_to_end(y._pool_key)
+            if len(idle) < self.size:
+                idle.append(y)
+                y = None
+            extra = []
+            while len(self._idle) > self.MAX_PROFILES:
+                extra += self._idle.popitem(last=False)[1]
+        for old in ([y] if y is not None else []) + extra:
+            self._retire(old)
+
+    @contextmanager
+    def leased(self, profile: str, opts: dict, cls, **overrides):
+        y = self.lease(profile, opts, cls, **overrides)
+        healthy = True
+        try:
+            yield y
+        except ytdlp().DownloadError:
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self.release(y, healthy)
+
+    @staticmethod
+    def _healthy(y) -> bool:
+        # deferred steps still to run, or a playlist recursion that never unwound
+        return not getattr(y, "deferred", None) and y._playlist_level == 0 and not y._playlist_urls
+
+    @staticmethod
+    def _reset(y):
+        # per-job params (format, outtmpl, ratelimit, fragment counts) go back to the profile's
+        y.params.clear()
+        y.params.update(y._pool_params)
+        y.format_selector = None
+        y._pps = {when: list(pps) for when, pps in y._pool_pps.items()}
+        y._progress_hooks = []
+        y._download_retcode = 0
+        y._num_downloads = 0
+        y._num_videos = 0
+        begin = getattr(y, "begin_job", None)
+        if begin is not None:
+            begin()
+
+    def _retire(self, y):
+        self.retired += 1
+        try:
+            y.close()
+        except Exception as e:
+            if DEBUG_LOG:
+                print("[pool] close failed:", repr(e))
+
+    def stats(self):
+        with self._lock:
+            idle = {key[0]: len(v) for key, v in self._idle.items()}
+        return {"idle": idle, "created": self.created, "reused": self.reused, "retired": self.retired,
+                "size": self.size, "max_uses": self.max_uses}
+
+
+YDL_POOL = YoutubeDLPool(YTDLP_POOL_SIZE, YTDLP_POOL_MAX_USES)
+
+
+def _download_profile(fmt_key: str, abitrate=None):
+    """(profile name, construction-time options) shared by every job with this choice."""
+    opts = {
+        "quiet": not DEBUG_LOG,
+        "no_warnings": True,
+        "noplaylist": True,
+        "retries": 3,
+        "socket_timeout": 30,
+        "cookiefile": "cookies.txt",
+    }
+
+    if DEBUG_LOG:
+        opts["verbose"] = True
+
+    # post-processing / ffmpeg options
+    if fmt_key == "audio":
+        if not has_ffmpeg():
+            return "audio", opts
+        pp = {"key": "FFmpegExtractAudio", "preferredcodec": "mp3"}
+        pp["preferredquality"] = str(abitrate) if abitrate else "192"
+        opts["postprocessors"] = [pp]
+        return f"audio-{pp['preferredquality']}", opts
+    if not has_ffmpeg():
+        return "video", opts
+    opts["ffmpeg_location"] = ffmpeg_path()
+    opts["merge_output_format"] = "mp4"
+    return "video-ffmpeg", opts
+
+
+def _run_yt_dlp_extract(job: Job, profile, url: str, info: dict = None, **overrides):
+    """Download stage; returns (info, leased YoutubeDL).
+
+    The YoutubeDL goes back to YDL_POOL here unless it holds deferred post-processing,
+    in which case whoever runs ``y.deferred`` releases it afterwards.
+    """
+    api = ytdlp()
+    y = YDL_POOL.lease(*profile, api.StagedYoutubeDL, **overrides)
+    y.add_post_processor(api.DiskReservePP(job), when="before_dl")
+    GOVERNOR.register(job, y)
+    started = time.monotonic()
+    job.mark("extract_start", started)
+    healthy, done = True, False
+    try:
+        if info is not None:
+            # format selection + download only; the extractor already ran for /info
+            try:
+                result = y.process_ie_result(info, download=True)
+                done = True
+                return result, y
+            except DiskBudgetError:
+                raise
+            except Exception as e:
+                y.deferred.clear()
+                if DEBUG_LOG:
+                    print(f"[DEBUG] job {job.id} cached info failed, re-extracting: {repr(e)}")
+        result = y.extract_info(url, download=True)
+        done = True
+        return result, y
+    except (api.DownloadError, DiskBudgetError):
+        raise
+    except BaseException:
+        healthy = False
+        raise
+    finally:
+        GOVERNOR.unregister(job)
+        if y.extracted_at is not None:
+            ended = time.monotonic()
+            job.mark("extract_end", y.extracted_at)
+            job.mark("download_end", ended)
+            STAGE_SECONDS.observe(y.extracted_at - started, stage="extract")
+            STAGE_SECONDS.observe(ended - y.extracted_at, stage="download")
+        if not (done and y.deferred):
+            y.deferred.clear()
+            YDL_POOL.release(y, healthy)
+
+
+# ---------- Output cache ----------
+def _to_int(v):
+    try:
+        return int(v) if v else None
+    except Exception:
+        return None
+
+
+def _output_cache_key(identity: str, fmt_key: str, vres=None, abitrate=None) -> str:
+    """Digest of the canonical job parameters; options that don't change the output are dropped."""
+    if fmt_key == "audio":
+        params = ("audio", (abitrate or 192) if has_ffmpeg() else None)
+    else:
+        params = ("video", vres if has_ffmpeg() else None)
+    raw = json.dumps([identity, params, has_ffmpeg()])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _job_identities(url: str, info: dict = None):
+    """Keys a job's output can be found under: the normalized URL and the extractor video id."""
+    keys = [normalize_url(url)]
+    if info is None:
+        entry = INFO_CACHE.peek(url)
+        info = entry.info if entry else None
+    if info and info.get("extractor_key") and info.get("id"):
+        keys.append(f"{info['extractor_key']}:{info['id']}")
+    return list(dict.fromkeys(keys))
+
+
+class _TemplateFields(dict):
+    def __missing__(self, key):
+        return "NA"
+
+
+def _render_output_name(outtmpl_base: str, meta: dict, ext: str) -> str:
+    """Expand a %(field)s filename template from cached metadata, without a YoutubeDL instance."""
+    fields = _TemplateFields({k: sanitize_filename(str(v)) for k, v in (meta or {}).items() if v is not None})
+    try:
+        name = outtmpl_base % fields
+    except Exception:
+        name = outtmpl_base
+    return sanitize_filename(name) + "." + ext
+
+
+class OutputCache:
+    """On-disk cache of finished files keyed by canonical job parameters, bounded by a byte budget.
+
+    The index lives next to the files and is rewritten atomically under a file lock so several
+    gunicorn workers can share one cache directory.
+    """
+
+    META_FIELDS = ("id", "title", "uploader", "channel", "upload_date", "duration", "extractor", "ext")
+
+    def __init__(self, root, budget, policy="lru"):
+        self.root = Path(root)
+        self.budget = budget
+        self.policy = policy if policy in ("lru", "lfu") else "lru"
+        self._lock = threading.Lock()
+        self._index = {"entries": {}, "aliases": {}}
+        self._index_mtime = None
+        self.hits = 0
+        self.misses = 0
+        self.publishes = 0
+        self.evictions = 0
+        if self.enabled:
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                with self._locked():
+                    self._sweep()
+                    self._write_index()
+            except Exception as e:
+                self.budget = 0
+                if DEBUG_LOG:
+                    print("[cache] output cache disabled:", repr(e))
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    @property
+    def _index_path(self):
+        return self.root / "index.json"
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(self.root / "index.lock", "a") as lf:
+            fcntl.flock(lf, fcntl.LOCK_EX)
+            self._reload()
+            yield
+
+    def _reload(self):
+        try:
+            mtime = self._index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._index_mtime:
+            return
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._index = {"entries": data.get("entries", {}), "aliases": data.get("aliases", {})}
+            self._index_mtime = mtime
+        except Exception:
+            pass
+
+    def _write_index(self):
+        tmp = self.root / f".index-{uuid.uuid4().hex}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+        self._index_mtime = self._index_path.stat().st_mtime_ns
+
+    def _sweep(self):
+        """Drop index rows whose file vanished and files (incl. half-published temps) nobody indexes."""
+        entries = self._index["entries"]
+        for digest, e in list(entries.items()):
+            if not (self.root / e["file"]).is_file():
+                entries.pop(digest)
+        known = {e["file"] for e in entries.values()}
+        for p in self.root.iterdir():
+            if p.name in ("index.json", "index.lock") or p.name in known:
+                continue
+            try:
+                p.unlink()
+            except Exception:
+                pass
+        self._index["aliases"] = {a: d for a, d in self._index["aliases"].items() if d in entries}
+
+    def _resolve(self, key):
+        entries = self._index["entries"]
+        if key in entries:
+            return key
+        d = self._index["aliases"].get(key)
+        return d if d in entries else None
+
+    def lookup(self, keys):
+        """Return (path, meta) for the first cached key, or None."""
+        if not self.enabled:
+            return None
+        with self._locked():
+            for key in keys:
+                digest = self._resolve(key)
+                if digest is None:
+                    continue
+                e = self._index["entries"][digest]
+                path = self.root / e["file"]
+                if not path.is_file():
+                    continue
+                e["hits"] = e.get("hits", 0) + 1
+                e["last_used"] = time.time()
+                self._write_index()
+                self.hits += 1
+                return path, dict(e.get("meta") or {})
+            self.misses += 1
+            return None
+
+    def publish(self, keys, src, info: dict = None):
+        """Atomically add src under keys[0] (others become aliases), then evict to the budget."""
+        if not self.enabled or not keys:
+            return
+        src = Path(src)
+        size = src.stat().st_size
+        if size > self.budget:
+            return
+        digest = keys[0]
+        name = f"{digest}{src.suffix}"
+        tmp = self.root / f".tmp-{uuid.uuid4().hex}"
+        try:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                shutil.copyfile(src, tmp)
+            os.replace(tmp, self.root / name)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        meta = {k: (info or {}).get(k) for k in self.META_FIELDS}
+        meta["ext"] = src.suffix.lstrip(".") or meta.get("ext")
+        with self._locked():
+            now = time.time()
+            self._index["entries"][digest] = {
+                "file": name, "size": size, "hits": 0, "created_at": now, "last_used": now, "meta": meta,
+            }
+            for alias in keys[1:]:
+                if alias != digest:
+                    self._index["aliases"][alias] = digest
+            self.publishes += 1
+            self._evict(keep=digest)
+            self._write_index()
+
+    def _evict(self, keep=None):
+        entries = self._index["entries"]
+        total = sum(e["size"] for e in entries.values())
+        if total <= self.budget:
+            return
+        if self.policy == "lfu":
+            order = sorted(entries, key=lambda d: (entries[d].get("hits", 0), entries[d]["last_used"]))
+        else:
+            order = sorted(entries, key=lambda d: entries[d]["last_used"])
+        for digest in order:
+            if total <= self.budget:
+                break
+            if digest == keep:
+                continue
+            e = entries.pop(digest)
+            total -= e["size"]
+            self.evictions += 1
+            try:
+                (self.root / e["file"]).unlink()
+            except FileNotFoundError:
+                pass
+        self._index["aliases"] = {a: d for a, d in self._index["aliases"].items() if d in entries}
+
+    def stats(self):
+        with self._lock:
+            entries = self._index["entries"]
+            return {
+                "enabled": self.enabled,
+                "dir": str(self.root),
+                "policy": self.policy,
+                "budget_bytes": self.budget,
+                "used_bytes": sum(e["size"] for e in entries.values()),
+                "entries": len(entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "publishes": self.publishes,
+                "evictions": self.evictions,
+            }
+
+
+OUTPUT_CACHE = OutputCache(OUTPUT_CACHE_DIR, OUTPUT_CACHE_BYTES, OUTPUT_CACHE_POLICY)
+
+
+def _output_cache_keys(url, fmt_key, vres, abitrate, info=None):
+    return [_output_cache_key(i, fmt_key, vres, abitrate) for i in _job_identities(url, info)]
+
+
+def _finish_from_output_cache(job: Job, url: str, fmt_key: str, filename=None, video_res=None, audio_bitrate=None):
+    """Link a cached output into job.tmp and mark the job finished; False on a cache miss."""
+    if not OUTPUT_CACHE.enabled or not URL_RE.match(url or ""):
+        return False
+    hit = OUTPUT_CACHE.lookup(_output_cache_keys(url, fmt_key, _to_int(video_res), _to_int(audio_bitrate)))
+    if hit is None:
+        return False
+    path, meta = hit
+    _, outtmpl_base = _build_outtmpl_base(filename)
+    target = job.tmp.joinpath(_render_output_name(outtmpl_base, meta, path.suffix.lstrip(".")))
+    try:
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copyfile(path, target)
+    except Exception as e:
+        if DEBUG_LOG:
+            print(f"[cache] job {job.id} could not use cached output: {repr(e)}")
+        return False
+    size = target.stat().st_size
+    job.file = str(target)
+    job.total_bytes = job.downloaded_bytes = size
+    job.percent = 100
+    job.status = "finished"
+    job.stage = "done"
+    _notify(job)
+    _job_finished(job)
+    if DEBUG_LOG:
+        print(f"[cache] job {job.id} served from output cache file={job.file}")
+    return True
+
+
+def _build_outtmpl_base(filename: str = None):
+    """Return (prefix_safe, outtmpl_base) for the user's filename or yt-dlp template."""
+    base_template = (filename.strip() if filename else "%(title)s").rstrip(".")
+    if "%(" in base_template and ")" in base_template:
+        def _replace_outside_tokens(s):
+            out = []
+            i = 0
+            while i < len(s):
+                if s[i] == "%" and i + 1 < len(s) and s[i + 1] == "(":
+                    j = i + 2
+                    while j < len(s) and s[j] != ")":
+                        j += 1
+                    if j < len(s):
+                        out.append(s[i:j+1])
+                        i = j + 1
+                        continue
+                    else:
+                        out.append(s[i:])
+                        break
+                else:
+                    out.append(s[i])
+                    i += 1
+            joined = "".join(out)
+            return _FILENAME_SANITIZE_RE.sub("_", joined)
+        safe_base = _replace_outside_tokens(base_template)
+    else:
+        safe_base = sanitize_filename(base_template)
+
+    prefix_safe = _FILENAME_SANITIZE_RE.sub("_", APP_PREFIX.strip() or "Hyper_Downloader")
+    return prefix_safe, f"{prefix_safe}__{safe_base}"
+
+
+# ---------- In-flight deduplication ----------
+INFLIGHT = {}
+INFLIGHT_LOCK = threading.Lock()
+
+
+def _attach_or_lead(job: Job, url: str, fmt_key: str, filename=None, video_res=None, audio_bitrate=None):
+    """Coalesce job onto an identical in-flight download; True if it became a follower."""
+    job.filename = filename
+    job.dedupe_key = _output_cache_key(normalize_url(url), fmt_key, _to_int(video_res), _to_int(audio_bitrate))
+    with INFLIGHT_LOCK:
+        leader = INFLIGHT.get(job.dedupe_key)
+        if leader is None:
+            INFLIGHT[job.dedupe_key] = job
+            return False
+        job.leader = leader
+        job.status = leader.status
+        job.percent = leader.percent
+        _retain_dir(leader.tmp)
+        leader.followers = leader.followers + (job,)
+    if DEBUG_LOG:
+        print(f"[DEBUG] job {job.id} coalesced onto {leader.id}")
     return True
 
 
+def _mirror_progress(job: Job):
+    for f in list(job.followers):
+        f.status = job.status
+        f.percent = job.percent
+        f.total_bytes = job.total_bytes
+        f.downloaded_bytes = job.downloaded_bytes
+        f.speed_bytes = job.speed_bytes
+        f.stage = job.stage
+        _notify(f)
+
+
+def _settle_followers(leader: Job):
+    """Hand the leader's outcome to every coalesced job and close the in-flight entry."""
+    with INFLIGHT_LOCK:
+        if INFLIGHT.get(leader.dedupe_key) is leader:
+            INFLIGHT.pop(leader.dedupe_key)
+        followers, leader.followers = leader.followers, ()
+    for f in followers:
+        f.error = leader.error
+        f.speed_bytes = 0
+        f.stage = "done"
+        # the leader's phases, shifted onto the follower's own clock
+        shift = leader.created_at - f.created_at
+        for phase, at in (leader.timings or {}).items():
+            if phase != "queued":
+                f.timings = f.timings or {}
+                f.timings.setdefault(phase, round(at + shift, 3))
+        if leader.status == "finished" and leader.file:
+            _, outtmpl_base = _build_outtmpl_base(f.filename)
+            f.file = leader.file
+            f.download_name = _render_output_name(outtmpl_base, leader.meta, Path(leader.file).suffix.lstrip("."))
+            f.total_bytes = f.downloaded_bytes = leader.total_bytes or leader.downloaded_bytes
+            f.percent = 100
+        f.status = leader.status if leader.status in ("finished", "error") else "error"
+        if f.status == "error" and not f.error:
+            f.error = "Shared download failed"
+        _notify(f)
+        _job_finished(f)
+
+
+def _complete_job(job: Job):
+    job.stage = "done"
+    job.mark("done")
+    DISK.settle(job)
+    _notify(job)
+    _job_finished(job)
+    _settle_followers(job)
+
+
 def run_download(job: Job, url: str, fmt_key: str, filename: str = None, video_res=None, audio_bitrate=None):
-    """Run yt-dlp with ffmpeg-safe fallbacks so it works even when ffmpeg is missing."""
+    """Run yt-dlp with ffmpeg-safe fallbacks so it works even when ffmpeg is missing.
+
+    This is the network stage; ffmpeg work is handed to ``postprocess_pool`` so it doesn't hold
+    a download slot.
+    """
+    handed_off = False
+    STAGE_SECONDS.observe(max(0.0, time.time() - job.created_at), stage="queue")
+    try:
+        job.stage = "download"
+        _notify(job)
+        handed_off = _download_job(job, url, fmt_key, filename, video_res, audio_bitrate)
+    finally:
+        if not handed_off:
+            _complete_job(job)
+
+
+def _post_process_stage(job: Job, ydl, url, fmt_key, vres, abitrate, prefix_safe, result):
+    started = time.monotonic()
+    job.mark("postprocess_start", started)
+    try:
+        job.stage = "postprocess"
+        _mirror_progress(job)
+        _notify(job)
+        try:
+            for step in ydl.deferred:
+                step()
+        finally:
+            ydl.deferred.clear()
+            YDL_POOL.release(ydl)
+        _finish_output(job, url, fmt_key, vres, abitrate, prefix_safe, result)
+    except Exception as e:
+        job.status = "error"
+        job.error = f"Post-processing failed: {str(e)[:400]}"
+        if DEBUG_LOG:
+            print(f"[ERROR] job {job.id} post-processing exception: {repr(e)}")
+    finally:
+        job.mark("postprocess_end")
+        STAGE_SECONDS.observe(job.timings["postprocess_end"] - job.timings["postprocess_start"], stage="postprocess")
+        _complete_job(job)
+
+
+def _finish_output(job: Job, url, fmt_key, vres, abitrate, prefix_safe, result):
+    job.mark("discovery_start")
+    found = _find_output_file(job.tmp, prefix_safe)
+    if found:
+        job.file = str(found)
+        job.status = "finished"
+        if DEBUG_LOG:
+            print(f"[DEBUG] job {job.id} finished file={job.file}")
+    else:
+        files = list(job.tmp.glob("*"))
+        files = [p for p in files if p.is_file()]
+        if files:
+            job.file = str(max(files, key=lambda p: p.stat().st_size))
+            job.status = "finished"
+            if DEBUG_LOG:
+                print(f"[DEBUG] job {job.id} fallback file={job.file}")
+        else:
+            job.status = "error"
+            job.error = "No output file produced"
+            if DEBUG_LOG:
+                print(f"[ERROR] job {job.id} - no output file found in {job.tmp}")
+    job.mark("discovery_end")
+
+    if job.status == "finished" and OUTPUT_CACHE.enabled:
+        try:
+            OUTPUT_CACHE.publish(_output_cache_keys(url, fmt_key, vres, abitrate, result), job.file, result)
+        except Exception as e:
+            if DEBUG_LOG:
+                print(f"[cache] job {job.id} publish failed: {repr(e)}")
+        job.mark("publish_end")
+
+
+def _download_job(job: Job, url: str, fmt_key: str, filename: str = None, video_res=None, audio_bitrate=None):
     try:
         if not URL_RE.match(url):
             job.status = "error"
             job.error = "Invalid URL"
             return
 
-        try:
-            vres = int(video_res) if video_res else None
-        except Exception:
-            vres = None
-        try:
-            abitrate = int(audio_bitrate) if audio_bitrate else None
-        except Exception:
-            abitrate = None
+        vres = _to_int(video_res)
+        abitrate = _to_int(audio_bitrate)
 
         # --- Format selection (ffmpeg aware) ---
         if fmt_key == "audio":
             fmt = "bestaudio[ext=m4a]/bestaudio/best"
         else:
-            if HAS_FFMPEG:
+            if has_ffmpeg():
                 fmt = _build_video_format(vres)
             else:
                 # No ffmpeg → pick single best stream (no merge)
                 fmt = "best[ext=mp4]/best"
+        # without ffmpeg nothing is merged or transcoded, so the bytes on disk are the final file
+        job.streamable = PROGRESSIVE_FETCH and not has_ffmpeg()
 
         def hook(d):
             try:
                 st = d.get("status")
                 if st == "downloading":
                     job.status = "downloading"
+                    job.mark("download_start")
+                    if job.streamable and not job.stream_path:
+                        job.stream_final = d.get("filename")
+                        job.stream_path = d.get("tmpfilename") or job.stream_final
+                        job.stream_size = d.get("total_bytes")  # not the estimate: sent as Content-Length
                     total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
-                    downloaded = d.get("downloaded_bytes", 0) or 0
+                    downloaded = int(d.get("downloaded_bytes", 0) or 0)
+                    # the counter restarts with each file (video, then audio)
+                    fresh = downloaded - job.downloaded_bytes if downloaded >= job.downloaded_bytes else downloaded
+                    BYTES_IN.inc(fresh)
+                    DISK.wrote(job, fresh)
                     job.total_bytes = int(total or 0)
-                    job.downloaded_bytes = int(downloaded or 0)
-                    job.speed_bytes = d.get("speed") or 0
+                    job.downloaded_bytes = downloaded
+                    job.add_speed_sample(d.get("speed") or 0)
                     if job.total_bytes:
                         job.percent = int(
                             min(
@@ -1108,69 +3575,33 @@ def run_download(job: Job, url: str, fmt_key: str, filename: str = None, video_r
                         )
                 elif st == "finished":
                     job.percent = 100
+                    job.stream_done = True
+                _notify(job)
+                _mirror_progress(job)
             except Exception:
                 pass
 
-        base_template = (filename.strip() if filename else "%(title)s").rstrip(".")
-        if "%(" in base_template and ")" in base_template:
-            def _replace_outside_tokens(s):
-                out = []
-                i = 0
-                while i < len(s):
-                    if s[i] == "%" and i + 1 < len(s) and s[i + 1] == "(":
-                        j = i + 2
-                        while j < len(s) and s[j] != ")":
-                            j += 1
-                        if j < len(s):
-                            out.append(s[i:j+1])
-                            i = j + 1
-                            continue
-                        else:
-                            out.append(s[i:])
-                            break
-                    else:
-                        out.append(s[i])
-                        i += 1
-                joined = "".join(out)
-                return _FILENAME_SANITIZE_RE.sub("_", joined)
-            safe_base = _replace_outside_tokens(base_template)
-        else:
-            safe_base = sanitize_filename(base_template)
-
-        prefix_safe = _FILENAME_SANITIZE_RE.sub("_", APP_PREFIX.strip() or "Hyper_Downloader")
-        outtmpl_base = f"{prefix_safe}__{safe_base}"
+        prefix_safe, outtmpl_base = _build_outtmpl_base(filename)
         outtmpl = str(job.tmp.joinpath(outtmpl_base + ".%(ext)s"))
 
-        opts = {
-            "format": fmt,
-            "outtmpl": outtmpl,
-            "progress_hooks": [hook],
-            "quiet": not DEBUG_LOG,
-            "no_warnings": True,
-            "noplaylist": True,
-            "retries": 3,
-            "socket_timeout": 30,
-            "cookiefile": "cookies.txt",
-        }
-
-        if DEBUG_LOG:
-            opts["verbose"] = True
-
-        # post-processing / ffmpeg options
-        if fmt_key == "audio":
-            if HAS_FFMPEG:
-                pp = {"key": "FFmpegExtractAudio", "preferredcodec": "mp3"}
-                pp["preferredquality"] = str(abitrate) if abitrate else "192"
-                opts["postprocessors"] = [pp]
-        else:
-            if HAS_FFMPEG:
-                opts["ffmpeg_location"] = _FFMPEG
-                opts["merge_output_format"] = "mp4"
-
         try:
             if DEBUG_LOG:
                 print(f"[DEBUG] Starting download job {job.id} fmt={fmt} outtmpl={outtmpl} url={url}")
-            _run_yt_dlp_extract(job, opts, url)
+            result, ydl = _run_yt_dlp_extract(
+                job, _download_profile(fmt_key, abitrate), url, _reusable_info(url),
+                format=fmt, outtmpl=outtmpl, progress_hooks=[hook],
+            )
+            job.meta = {k: (result or {}).get(k) for k in OutputCache.META_FIELDS}
+        except DiskBudgetDeferred as e:
+            # give the download slot to jobs that fit; this one runs again when space frees up
+            DISK.defer(job, e.need, job.requeue)
+            return True
+        except DiskBudgetError as e:
+            job.status = "error"
+            job.error = str(e)
+            if DEBUG_LOG:
+                print(f"[disk] job {job.id} not admitted: {e}")
+            return
         except Exception as e:
             job.status = "error"
             job.error = f"yt-dlp failed: {str(e)[:400]}"
@@ -1178,25 +3609,17 @@ def run_download(job: Job, url: str, fmt_key: str, filename: str = None, video_r
                 print(f"[ERROR] job {job.id} yt-dlp exception: {repr(e)}")
             return
 
-        found = _find_output_file(job.tmp, prefix_safe)
-        if found:
-            job.file = str(found)
-            job.status = "finished"
-            if DEBUG_LOG:
-                print(f"[DEBUG] job {job.id} finished file={job.file}")
-        else:
-            files = list(job.tmp.glob("*"))
-            files = [p for p in files if p.is_file()]
-            if files:
-                job.file = str(max(files, key=lambda p: p.stat().st_size))
-                job.status = "finished"
-                if DEBUG_LOG:
-                    print(f"[DEBUG] job {job.id} fallback file={job.file}")
-            else:
-                job.status = "error"
-                job.error = "No output file produced"
-                if DEBUG_LOG:
-                    print(f"[ERROR] job {job.id} - no output file found in {job.tmp}")
+        if ydl.deferred:
+            job.stage = "postprocess_queued"
+            job.mark("postprocess_queued")
+            _mirror_progress(job)
+            _notify(job)
+            postprocess_pool.submit(
+                _post_process_stage, job, ydl, url, fmt_key, vres, abitrate, prefix_safe, result,
+                priority=_job_priority(fmt_key, vres), job=job,
+            )
+            return True
+        _finish_output(job, url, fmt_key, vres, abitrate, prefix_safe, result)
     except Exception as e:
         job.status = "error"
         job.error = str(e)[:400]
@@ -1204,20 +3627,254 @@ def run_download(job: Job, url: str, fmt_key: str, filename: str = None, video_r
             print(f"[ERROR] run_download unexpected: {repr(e)}")
 
 
+def _enqueue_job(job: Job, params: dict, client: str = ""):
+    """Journal a job and coalesce it onto an in-flight download or queue it for run_download."""
+    args = (
+        params.get("url", ""),
+        params.get("format_choice", "video"),
+        params.get("filename"),
+        params.get("video_res"),
+        params.get("audio_bitrate"),
+    )
+    job.mark("queued")
+    JOURNAL.start(job, {**params, "client": client})
+    if _attach_or_lead(job, *args):
+        return
+    # also used to queue the job again after it waited for disk space
+    job.requeue = functools.partial(
+        executor.submit,
+        run_download,
+        job,
+        *args,
+        client=client,
+        priority=_job_priority(args[1], args[3]),
+        job=job,
+    )
+    job.requeue()
+
+
+_JOB_PARAMS = ("url", "format_choice", "filename", "video_res", "audio_bitrate")
+
+
+def _submit_job(job: Job, params: dict, client: str = ""):
+    """Finish job from the output cache, or queue it."""
+    if _finish_from_output_cache(job, params.get("url", ""), params.get("format_choice", "video"),
+                                 params.get("filename"), params.get("video_res"), params.get("audio_bitrate")):
+        return
+    _enqueue_job(job, params, client)
+
+
 @app.post("/start")
 def start():
     d = request.json or {}
+    addr = _client_addr()
+    refused = _admit_client(addr)
+    if refused:
+        return refused
     job = Job()
-    executor.submit(
-        run_download,
-        job,
-        d.get("url", ""),
-        d.get("format_choice", "video"),
-        d.get("filename"),
-        d.get("video_res"),
-        d.get("audio_bitrate"),
-    )
-    return jsonify({"job_id": job.id})
+    _own_job(job, addr)
+    client = _client_key()
+    _submit_job(job, {k: d.get(k) for k in _JOB_PARAMS if d.get(k) is not None}, client)
+    return jsonify({"job_id": job.id, "live": _can_hold_requests()})
+
+
+# ---------- Batches ----------
+BATCHES = {}  # parent job id -> Batch, while it still has entries to expand or run
+
+
+def _playlist_entries(url: str):
+    """Yield entry URLs of a playlist/channel as yt-dlp pages through it; a single video yields itself."""
+    opts = {"extract_flat": "in_playlist", "lazy_playlist": True, "skip_download": True, "quiet": True,
+            "no_warnings": True, "cookiefile": "cookies.txt"}
+    with ytdlp().YoutubeDL(opts) as y:
+        info = _resolve_listing(y, url)
+        if not info:
+            return
+        if info.get("_type") not in ("playlist", "multi_video"):
+            yield info.get("webpage_url") or url
+            return
+        yield from _listing_videos(y, info, {url}, 0)
+
+
+def _resolve_listing(y, url, ie_key=None):
+    """Unprocessed extraction of ``url``, following url results to the page that has the entries."""
+    info = y.extract_info(url, download=False, process=False, ie_key=ie_key)
+    # channel/tab pages may redirect to the real listing before any entries show up
+    for _ in range(3):
+        if not info or info.get("_type") != "url" or not info.get("url"):
+            break
+        info = y.extract_info(info["url"], download=False, process=False, ie_key=info.get("ie_key"))
+    return info
+
+
+def _listing_videos(y, info, seen, depth):
+    """Video URLs of a flat listing, walking nested listings instead of queueing them.
+
+    A channel lists its tabs (Videos, Shorts, ...) as playlists, either inline or as url
+    results of a playlist-capable extractor; the first tab's URL is the channel's own.
+    """
+    for entry in info.get("entries") or ():
+        if not entry:
+            continue
+        u = entry.get("url") or entry.get("webpage_url")
+        if entry.get("_type") in ("playlist", "multi_video"):
+            if depth < 2:
+                yield from _listing_videos(y, entry, seen, depth + 1)
+            continue
+        if not u or not URL_RE.match(u):
+            continue
+        ie_key = entry.get("ie_key")
+        # only extractors that may return playlists are worth an extra request; videos are queued as-is
+        if ie_key and depth < 2 and y.get_info_extractor(ie_key)._RETURN_TYPE in ("playlist", "any"):
+            if u in seen:
+                continue
+            seen.add(u)
+            nested = _resolve_listing(y, u, ie_key)
+            if nested and nested.get("_type") in ("playlist", "multi_video"):
+                yield from _listing_videos(y, nested, seen, depth + 1)
+                continue
+        yield u
+
+
+class Batch:
+    """Feeds a parent job's entries to the download queue, at most ``cap`` of them at a time.
+
+    Entries become child jobs as soon as they are listed, so they show up in the parent's
+    progress while the listing is still being paged through.
+    """
+
+    def __init__(self, parent: Job, params: dict, client: str, cap: int, addr: str = ""):
+        self.parent = parent
+        self.params = params
+        self.client = client
+        self.addr = addr  # children count against this address's MAX_JOBS_PER_CLIENT
+        self.cap = cap
+        self.pending = deque()  # (child, url) not yet handed to the queue
+        self.running = 0
+        self.expanding = True
+        self._filling = False
+        self._lock = threading.Lock()
+
+    def expand(self, source):
+        parent = self.parent
+        try:
+            entries = iter(source) if isinstance(source, list) else _playlist_entries(source)
+            for url in entries:
+                if len(parent.children) >= MAX_BATCH_ENTRIES or len(JOBS) >= MAX_JOBS:
+                    parent.error = f"Batch stopped after {len(parent.children)} entries"
+                    break
+                if CLIENT_JOBS.get(self.addr, 0) >= MAX_JOBS_PER_CLIENT:
+                    parent.error = f"Batch stopped after {len(parent.children)} entries (too many recent jobs)"
+                    break
+                child = Job()
+                _own_job(child, self.addr)
+                child.parent = parent.id
+                parent.children.append(child.id)
+                with self._lock:
+                    self.pending.append((child, url))
+                self._fill()
+                self._update()
+        except Exception as e:
+            parent.error = f"Playlist listing failed: {str(e)[:400]}"
+            if DEBUG_LOG:
+                print(f"[batch] {parent.id} expansion failed: {repr(e)}")
+        finally:
+            with self._lock:
+                self.expanding = False
+            if DEBUG_LOG:
+                print(f"[batch] {parent.id} listed {len(parent.children)} entries")
+            self._update()
+
+    def _fill(self):
+        # one thread drains pending at a time; a cache hit finishing inside _submit_job
+        # re-enters through child_done and leaves the loop here to pick up its slot
+        with self._lock:
+            if self._filling:
+                return
+            self._filling = True
+        while True:
+            with self._lock:
+                if not self.pending or self.running >= self.cap:
+                    self._filling = False
+                    return
+                child, url = self.pending.popleft()
+                self.running += 1
+            try:
+                _submit_job(child, {**self.params, "url": url}, self.client)
+            except Exception as e:
+                child.status = "error"
+                child.error = str(e)[:400]
+                _notify(child)
+                _job_finished(child)
+
+    def child_done(self, child: Job):
+        with self._lock:
+            self.running -= 1
+        self._fill()
+        self._update()
+
+    def _update(self):
+        parent = self.parent
+        with self._lock:
+            expanding, running = self.expanding, self.running
+            idle = not expanding and not self.pending and running == 0
+        children = [c for c in (JOBS.get(cid) for cid in parent.children) if c is not None]
+        if idle:
+            ok = any(c.status in ("finished", "downloaded") for c in children)
+            parent.status = "finished" if ok else "error"
+            if not ok and not parent.error:
+                parent.error = "All entries failed" if children else "Nothing to download"
+            parent.stage = "done"
+            parent.percent = 100
+            BATCHES.pop(parent.id, None)
+        else:
+            if parent.status == "queued" and running:
+                parent.status = "downloading"
+            if not expanding:
+                parent.stage = "download"
+        _notify(parent)
+
+
+def _job_finished(job: Job):
+    """Bookkeeping for a job that just reached finished/error."""
+    _count_outcome(job)
+    if job.parent is not None:
+        batch = BATCHES.get(job.parent)
+        if batch is not None:
+            batch.child_done(job)
+
+
+@app.post("/start-batch")
+def start_batch():
+    """Start a batch from {"urls": [...]} or a playlist/channel {"url": ...}; entries share the other options."""
+    d = request.json or {}
+    urls, url = d.get("urls"), d.get("url")
+    if urls is not None:
+        if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and URL_RE.match(u) for u in urls):
+            return jsonify({"error": "urls must be a non-empty list of http(s) URLs"}), 400
+        if len(urls) > MAX_BATCH_ENTRIES:
+            return jsonify({"error": f"At most {MAX_BATCH_ENTRIES} URLs per batch"}), 400
+        source = list(urls)
+    elif isinstance(url, str) and URL_RE.match(url):
+        source = url
+    else:
+        return jsonify({"error": "Provide a playlist url or a list of urls"}), 400
+    addr = _client_addr()
+    refused = _admit_client(addr)
+    if refused:
+        return refused
+    if isinstance(source, list) and CLIENT_JOBS.get(addr, 0) + 1 + len(source) > MAX_JOBS_PER_CLIENT:
+        return jsonify({"error": "Too many recent jobs for a batch this size, try again later"}), 429
+    client = _client_key()
+    cap = min(_to_int(d.get("concurrency")) or BATCH_CONCURRENCY, BATCH_CONCURRENCY)
+    parent = Job()
+    _own_job(parent, addr)
+    parent.children = []
+    parent.stage = "expanding"
+    params = {k: d.get(k) for k in _JOB_PARAMS if k != "url" and d.get(k) is not None}
+    batch = BATCHES[parent.id] = Batch(parent, params, client, max(1, cap), addr)
+    threading.Thread(target=batch.expand, args=(source,), name=f"batch-{parent.id[:8]}", daemon=True).start()
+    return jsonify({"job_id": parent.id})
 
 
 @app.post("/info")
@@ -1225,8 +3882,7 @@ def info():
     d = request.json or {}
     url = d.get("url", "")
     try:
-        with YoutubeDL({"skip_download": True, "quiet": True, "noplaylist": True, "cookiefile": "cookies.txt"}) as y:
-            info = y.extract_info(url, download=False)
+        info = INFO_CACHE.get_or_extract(url, _extract_preview)
         title = info.get("title", "")
         channel = info.get("uploader") or info.get("channel", "")
         thumb = info.get("thumbnail")
@@ -1238,11 +3894,7 @@ def info():
         return jsonify({"error": "Preview failed", "detail": str(e)[:400]}), 400
 
 
-@app.get("/progress/<id>")
-def progress(id):
-    j = JOBS.get(id)
-    if not j:
-        abort(404)
+def _progress_payload(j: Job) -> dict:
     speed_b = getattr(j, "speed_bytes", 0) or 0
     eta_seconds = None
     downloaded = getattr(j, "downloaded_bytes", 0) or 0
@@ -1252,15 +3904,219 @@ def progress(id):
             eta_seconds = int((total - downloaded) / speed_b)
         except Exception:
             eta_seconds = None
-    return jsonify({
+    return {
         "percent": j.percent,
         "status": j.status,
         "error": j.error,
         "speed_bytes": speed_b,
         "downloaded_bytes": downloaded,
         "total_bytes": total,
-        "eta_seconds": eta_seconds
-    })
+        "eta_seconds": eta_seconds,
+        "stream_url": _stream_url(j),
+        "stage": j.stage,
+        "timings": j.timings,
+        **_queue_fields(j),
+        **(_batch_fields(j) if j.children is not None else {}),
+    }
+
+
+def _batch_fields(j: Job) -> dict:
+    """Aggregate progress of a batch parent over its entries."""
+    entries, done, failed = [], 0, 0
+    percent = downloaded = total = speed = 0
+    for cid in list(j.children):
+        c = JOBS.get(cid)
+        if c is None:
+            entries.append({"id": cid, "status": "expired"})
+            done += 1
+            percent += 100
+            continue
+        finished = c.status in ("finished", "downloaded")
+        done += finished or c.status == "error"
+        failed += c.status == "error"
+        percent += 100 if c.status in _TERMINAL_STATUSES else c.percent or 0
+        downloaded += c.downloaded_bytes or 0
+        total += c.total_bytes or 0
+        if c.status == "downloading":
+            speed += c.speed_bytes or 0
+        entries.append({"id": cid, "status": c.status, "percent": c.percent, "stage": c.stage, "error": c.error})
+    count = len(entries)
+    return {
+        "percent": j.percent if j.status in _TERMINAL_STATUSES else (percent // count if count else 0),
+        "speed_bytes": speed,
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "eta_seconds": int((total - downloaded) / speed) if speed and total > downloaded else None,
+        "entries": entries,
+        "entries_done": done,
+        "entries_failed": failed,
+        "listing_done": j.stage != "expanding",
+    }
+
+
+def _queue_fields(j: Job) -> dict:
+    if j.snapshot:
+        return j.queue or {"queue_position": None, "eta_start_seconds": None}
+    src = j.leader or j
+    if src.stage == "postprocess_queued":
+        pos = postprocess_pool.position(src)
+    else:
+        pos = executor.position(src) if j.status == "queued" else None
+    if pos is None:
+        return {"queue_position": None, "eta_start_seconds": None}
+    return {"queue_position": pos[0], "eta_start_seconds": pos[1]}
+
+
+def _stream_url(j: Job):
+    src = j.leader or j
+    if src.streamable and src.stream_path and not j.file and src.status == "downloading":
+        # a download-sized request would pin a sync worker; those users get the file when it is done
+        if has_request_context() and not _can_hold_requests():
+            return None
+        return f"/fetch/{j.id}/stream"
+    return None
+
+
+@app.get("/progress/<id>")
+def progress(id):
+    j = JOBS.get(id)
+    if not j:
+        abort(404)
+    return jsonify(_progress_payload(j))
+
+
+_TERMINAL_STATUSES = ("finished", "error", "downloaded")
+
+
+def _can_hold_requests() -> bool:
+    """True when each request gets its own thread or greenlet (gthread, gevent, the dev server).
+
+    A sync gunicorn worker serves one request at a time, so a long-lived response would
+    block it for everyone and get it killed at the worker timeout.
+    """
+    return bool(request.environ.get("wsgi.multithread"))
+
+
+@app.get("/progress/<id>/stream")
+def progress_stream(id):
+    """Server-Sent Events view of /progress: one event per state change, throttled per job."""
+    j = JOBS.get(id)
+    if not j:
+        abort(404)
+    if not _can_hold_requests():
+        return jsonify({"error": "Live progress needs a threaded server, poll /progress/<id> instead"}), 503
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_id = None
+    min_gap = 1.0 / PROGRESS_STREAM_HZ if PROGRESS_STREAM_HZ > 0 else 0
+
+    def events():
+        job = j
+        seen = last_id
+        last_payload = None
+        last_sent = 0.0
+        deadline = time.monotonic() + PROGRESS_STREAM_MAX_SECONDS
+        yield f"retry: {int(max(min_gap, 1) * 1000)}\n\n"
+        while time.monotonic() < deadline:
+            if job.snapshot:
+                # owned by another worker: nothing signals us, so re-read the store at the stream rate
+                if seen is not None:
+                    time.sleep(max(min_gap, JOB_STORE_SYNC_SECONDS))
+                job = _refresh(job)
+            with job.cond:
+                if seen is not None and job.version == seen and not job.snapshot:
+                    job.cond.wait(max(0.0, min(15, deadline - time.monotonic())))
+                version = job.version
+            if seen is not None and version == seen:
+                if not job.snapshot:
+                    yield ": ping\n\n"
+                continue
+            wait = last_sent + min_gap - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+                with job.cond:
+                    version = job.version
+            payload = _progress_payload(job)
+            seen = version
+            if payload == last_payload:
+                continue
+            last_payload = payload
+            last_sent = time.monotonic()
+            yield f"id: {version}\ndata: {json.dumps(payload)}\n\n"
+            if payload["status"] in _TERMINAL_STATUSES:
+                return
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _artifact_etag(st: os.stat_result) -> str:
+    """Strong validator for a finished file: changes whenever the bytes on disk could have."""
+    raw = f"{st.st_dev}:{st.st_ino}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("ascii")).hexdigest()
+
+
+def _if_range_matches(etag: str, st: os.stat_result) -> bool:
+    if "If-Range" not in request.headers:
+        return True
+    ir = request.if_range
+    if ir.etag:
+        return ir.etag == etag
+    if ir.date:
+        return int(ir.date.timestamp()) == int(st.st_mtime)
+    return False
+
+
+class _DeliveryFile(io.BufferedReader):
+    """File whose first close() runs a callback; wsgi.file_wrapper closes it when the response ends."""
+
+    def __init__(self, path, on_close):
+        super().__init__(io.FileIO(path, "rb"))
+        self._on_close = on_close
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            cb, self._on_close = self._on_close, None
+            if cb:
+                cb()
+
+
+def _delivery_done(started, nbytes):
+    GOVERNOR.delivery_finished()
+    STAGE_SECONDS.observe(time.monotonic() - started, stage="fetch")
+    BYTES_OUT.inc(nbytes)
+
+
+def _file_body(path: str, start: int, length: int, size: int):
+    GOVERNOR.delivery_started()
+    # direct-passthrough responses skip call_on_close, so the file itself reports the end
+    f = _DeliveryFile(path, functools.partial(_delivery_done, time.monotonic(), length))
+    f.seek(start)
+    wrapper = request.environ.get("wsgi.file_wrapper")
+    # gunicorn's wrapper uses os.sendfile from the current offset and stops at Content-Length;
+    # other servers only get the wrapper when the range runs to EOF anyway
+    if wrapper and (start + length == size or request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn")):
+        return wrapper(f, 256 * 1024)
+
+    def gen():
+        try:
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(256 * 1024, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            f.close()
+
+    return gen()
 
 
 @app.get("/fetch/<id>")
@@ -1270,46 +4126,382 @@ def fetch(id):
         abort(404)
     if not j.file or not os.path.exists(j.file):
         return jsonify({"error": "File not ready"}), 400
-    j.downloaded_at = time.time()
-    j.status = "downloaded"
-    return send_file(j.file, as_attachment=True, download_name=os.path.basename(j.file))
+    st = os.stat(j.file)
+    size = st.st_size
+    etag = _artifact_etag(st)
+    name = j.download_name or os.path.basename(j.file)
+    headers = {
+        **_attachment_headers(name),
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": "private, no-transform",
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+
+    start, end, status = 0, size - 1, 200
+    rng = request.range
+    if rng is not None and rng.units == "bytes" and len(rng.ranges) == 1 and _if_range_matches(etag, st):
+        bounds = rng.range_for_length(size)
+        if bounds is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status=416, headers=headers)
+        start, end, status = bounds[0], bounds[1] - 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = max(0, end - start + 1)
+    headers["Content-Length"] = str(length)
+
+    if request.method != "HEAD":
+        j.mark("first_fetch")
+    # only the request carrying the last byte completes the transfer and starts the cleanup clock
+    if request.method != "HEAD" and end == size - 1:
+        j.downloaded_at = time.time()
+        j.status = "downloaded"
+        _notify(j)
+    body = None if request.method == "HEAD" else _file_body(j.file, start, length, size)
+    return Response(
+        body,
+        status=status,
+        headers=headers,
+        mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream",
+        direct_passthrough=True,
+    )
+
+
+def _delivering(resp: Response, sent: list) -> Response:
+    """Hold bandwidth headroom for a file transfer until the server closes its body."""
+    GOVERNOR.delivery_started()
+    started = time.monotonic()
+    resp.call_on_close(lambda: _delivery_done(started, sent[0]))
+    return resp
+
+
+def _attachment_headers(name: str) -> dict:
+    try:
+        name.encode("ascii")
+        disposition = f'attachment; filename="{name}"'
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+        disposition = f"attachment; filename=\"{simple}\"; filename*=UTF-8''{quote(name, safe='!#$&+^`|~')}"
+    return {"Content-Disposition": disposition}
+
+
+class StreamAborted(Exception):
+    """Raised mid-response so the server drops the connection instead of ending the body cleanly."""
+
+
+@app.get("/fetch/<id>/stream")
+def fetch_stream(id):
+    """Send a single-stream output while yt-dlp is still writing it, blocking at the write frontier."""
+    j = JOBS.get(id)
+    if not j:
+        abort(404)
+    if j.file and os.path.exists(j.file):
+        return fetch(id)
+    if not _can_hold_requests():
+        return jsonify({"error": "Streaming needs a threaded server, fetch the file when it is done"}), 503
+    src = j.leader or j
+    if not src.streamable:
+        return jsonify({"error": "Streaming not available for this format"}), 400
+    if src.status == "error":
+        return jsonify({"error": src.error or "Download failed"}), 400
+    if not src.stream_path:
+        return jsonify({"error": "Download not started yet"}), 409
+    f = None
+    for candidate in (src.stream_path, src.stream_final):
+        try:
+            f = open(candidate, "rb")
+            break
+        except (OSError, TypeError):
+            continue
+    if f is None:
+        return jsonify({"error": "File not ready"}), 400
+    name = os.path.basename(src.stream_final or src.stream_path)
+    size = src.stream_size
+    headers = {**_attachment_headers(name), "Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+    if size:
+        headers["Content-Length"] = str(size)
+    j.mark("first_fetch")
+    sent = [0]
+
+    def body():
+        live = src
+        try:
+            while True:
+                with live.cond:
+                    version = live.version
+                want = 256 * 1024 if not size else min(256 * 1024, size - sent[0])
+                chunk = f.read(want) if want > 0 else b""
+                if chunk:
+                    sent[0] += len(chunk)
+                    yield chunk
+                    continue
+                if live.status == "error":
+                    # a clean end would leave the browser with a truncated file it believes is complete
+                    raise StreamAborted(f"job {live.id} failed after {sent[0]} bytes")
+                if live.stream_done or live.file:
+                    # the .part file may have been renamed; our descriptor still sees all of it
+                    break
+                with live.cond:
+                    if live.version == version:
+                        live.cond.wait(1)
+                live = _refresh(live)
+            if size and os.fstat(f.fileno()).st_size != size:
+                raise StreamAborted(f"job {live.id} produced {os.fstat(f.fileno()).st_size} bytes, announced {size}")
+        finally:
+            f.close()
+        job = _refresh(j)
+        job.downloaded_at = time.time()
+        if job.status == "finished":
+            job.status = "downloaded"
+        _notify(job)
+
+    return _delivering(Response(stream_with_context(body()), mimetype="application/octet-stream", headers=headers), sent)
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable file zipfile writes into; the response drains it after every chunk."""
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.buf += b
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = bytes(self.buf)
+        self.buf.clear()
+        return out
+
+
+def _bundle_name(name: str, used: set) -> str:
+    name = name.replace("/", "_").replace("\\", "_") or "file"
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    candidate, n = name, 1
+    while candidate in used:
+        n += 1
+        candidate = f"{stem} ({n}){dot}{ext}"
+    used.add(candidate)
+    return candidate
+
+
+@app.get("/fetch-bundle")
+def fetch_bundle():
+    """Stream finished jobs' files as one stored (uncompressed) ZIP, built on the fly.
+
+    ``ids`` is a comma-separated list of job ids; a batch parent stands for all of its entries.
+    """
+    ids = [i for arg in request.args.getlist("ids") for i in arg.split(",") if i]
+    if not ids:
+        return jsonify({"error": "ids is required"}), 400
+    jobs, parents = [], []
+    for jid in ids:
+        j = JOBS.get(jid)
+        if j is None:
+            continue
+        if j.children is not None:
+            parents.append(j)
+            jobs.extend(c for c in (JOBS.get(cid) for cid in list(j.children)) if c is not None)
+        else:
+            jobs.append(j)
+    if len(jobs) > MAX_BATCH_ENTRIES:
+        return jsonify({"error": f"At most {MAX_BATCH_ENTRIES} files per bundle"}), 400
+    # open everything now so files expiring mid-bundle are still sent; one descriptor each
+    files, delivered, seen = [], [], set()
+    for j in jobs:
+        if not j.file:
+            continue
+        if j.file not in seen:
+            # coalesced jobs share one file; it goes in once
+            try:
+                files.append((j, open(j.file, "rb")))
+            except OSError:
+                continue
+            seen.add(j.file)
+        delivered.append(j)
+    if not files:
+        return jsonify({"error": "No finished files to bundle"}), 400
+    for j in delivered:
+        j.mark("first_fetch")
+    prefix_safe, _ = _build_outtmpl_base()
+    sent = [0]
+
+    def body():
+        sink, used = _ZipSink(), set()
+        try:
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:
+                for j, f in files:
+                    st = os.fstat(f.fileno())
+                    zi = zipfile.ZipInfo(_bundle_name(j.download_name or os.path.basename(j.file), used),
+                                         time.localtime(st.st_mtime)[:6])
+                    zi.file_size = st.st_size  # lets zipfile pick zip64 up front for >4 GiB files
+                    with zf.open(zi, "w") as dst:
+                        while True:
+                            chunk = f.read(256 * 1024)
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                            out = sink.drain()
+                            sent[0] += len(out)
+                            yield out
+            out = sink.drain()
+            sent[0] += len(out)
+            yield out
+        finally:
+            for _, f in files:
+                f.close()
+        now = time.time()
+        for j in delivered + parents:
+            job = _refresh(j)
+            job.downloaded_at = now
+            if job.status == "finished":
+                job.status = "downloaded"
+            _notify(job)
+
+    return _delivering(Response(
+        stream_with_context(body()),
+        mimetype="application/zip",
+        headers={**_attachment_headers(f"{prefix_safe}__bundle.zip"), "Cache-Control": "no-store",
+                 "X-Accel-Buffering": "no"},
+    ), sent)
 
 
 @app.get("/env")
 def env():
     return jsonify({
-        "ffmpeg": HAS_FFMPEG,
-        "ffmpeg_path": _FFMPEG,
+        "ffmpeg": has_ffmpeg(),
+        "ffmpeg_path": ffmpeg_path(),
         "debug": DEBUG_LOG,
         "prefix": APP_PREFIX,
-        "max_concurrent": MAX_CONCURRENT
+        "max_concurrent": MAX_CONCURRENT,
+        "stages": {"download": executor.stats(), "postprocess": postprocess_pool.stats()},
+        "job_store": JOBS.describe(),
+        "info_cache": INFO_CACHE.stats(),
+        "output_cache": OUTPUT_CACHE.stats(),
+        "expiry": EXPIRY.stats(),
+        "disk": DISK.stats(),
+        "bandwidth": GOVERNOR.stats(),
+        "fragments": FRAGMENTS.stats(),
+        "ytdlp_pool": YDL_POOL.stats(),
     })
 
 
-def cleanup_worker():
-    while True:
-        try:
-            now = time.time()
-            remove = []
-            for jid, job in list(JOBS.items()):
-                if job.status in ("finished", "error") and (now - job.created_at > JOB_TTL_SECONDS):
-                    remove.append(jid)
-                if job.status == "downloaded" and job.downloaded_at and (now - job.downloaded_at > DOWNLOAD_KEEP_SECONDS):
-                    remove.append(jid)
-            for rid in remove:
-                j = JOBS.pop(rid, None)
-                if j:
-                    try:
-                        shutil.rmtree(str(j.tmp), ignore_errors=True)
-                    except Exception:
-                        pass
-        except Exception as e:
-            if DEBUG_LOG:
-                print("[cleanup] error:", repr(e))
-        time.sleep(CLEANUP_INTERVAL)
+def _family(name, help, samples, kind="gauge"):
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{labels} {value}" for labels, value in samples]
+    return lines
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition; gauges are read from counters kept by each component."""
+    lines = []
+    for m in _METRICS:
+        lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}"]
+        lines += [f"{name}{labels} {value}" for name, labels, value in m.samples()]
+    stages = {"download": executor.stats(), "postprocess": postprocess_pool.stats()}
+    lines += _family("hyper_queue_depth", "Jobs waiting for a worker",
+                    [(_label_str(("stage",), (k,)), v["queued"]) for k, v in stages.items()])
+    lines += _family("hyper_running_jobs", "Jobs being worked on",
+                    [(_label_str(("stage",), (k,)), v["running"]) for k, v in stages.items()])
+    # values() is a copy taken without holding any lock; counting happens outside the table
+    statuses = {}
+    for job in JOBS.values():
+        statuses[job.status] = statuses.get(job.status, 0) + 1
+    lines += _family("hyper_jobs", "Tracked jobs by status",
+                    [(_label_str(("status",), (k,)), v) for k, v in sorted(statuses.items())])
+    disk = DISK.stats()
+    lines += _family("hyper_temp_disk_bytes", "Bytes in job temp dirs", [("", _temp_disk_bytes())])
+    lines += _family("hyper_disk_reserved_bytes", "Disk reserved for running and unfetched jobs",
+                    [("", disk["reserved_bytes"])])
+    lines += _family("hyper_fragment_connections", "Open HLS/DASH fragment connections",
+                    [("", FRAGMENTS.in_use)])
+    info = INFO_CACHE.stats()
+    lines += _family("hyper_info_cache_requests_total", "Info cache lookups by result",
+                    [(_label_str(("result",), (k,)), info[k]) for k in ("hits", "misses", "negative_hits")], "counter")
+    lines += _family("hyper_info_cache_bytes", "Estimated size of cached info dicts", [("", info["bytes"])])
+    if OUTPUT_CACHE.enabled:
+        lines += _family("hyper_output_cache_requests_total", "Output cache lookups by result",
+                        [(_label_str(("result",), (k,)), getattr(OUTPUT_CACHE, k)) for k in ("hits", "misses")],
+                        "counter")
+    return Response("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def recover_jobs():
+    """Cold start: re-enqueue unfinished journaled jobs, restore fetchable ones, sweep orphan temp dirs."""
+    if not JOURNAL.enabled:
+        return
+    try:
+        if not JOURNAL.claim_cold_start():
+            return
+        now = time.time()
+        claimed = set()
+        holders = {}  # temp dir -> recovered jobs whose finished file lives in it
+        with JOURNAL.exclusive():
+            survivors = {}
+            for jid, rec in JOURNAL.read().items():
+                status = rec.get("status")
+                expired = now - (rec.get("created_at") or now) > JOB_TTL_SECONDS
+                if status in ("queued", "downloading") and not expired:
+                    survivors[jid] = rec
+                elif status == "finished" and rec.get("file") and os.path.exists(rec["file"]) and not expired:
+                    survivors[jid] = rec
+            JOURNAL.rewrite(survivors)
+        for jid, rec in survivors.items():
+            job = Job(job_id=jid, tmp=rec.get("tmp"))
+            job.created_at = rec.get("created_at") or now
+            if job._tmp is not None:
+                claimed.add(str(job._tmp))
+            params = {k: rec[k] for k in _JOB_PARAMS if rec.get(k) is not None}
+            if rec.get("status") == "finished":
+                job.file = rec["file"]
+                home = os.path.dirname(job.file)
+                claimed.add(home)
+                if job._tmp is None:
+                    # a coalesced follower: its file is in the leader's dir, which it now shares
+                    job._tmp = Path(home)
+                if str(job._tmp) == home:
+                    holders[home] = holders.get(home, 0) + 1
+                job.download_name = rec.get("download_name")
+                job.status = "finished"
+                job.stage = "done"
+                job.percent = 100
+                job.total_bytes = job.downloaded_bytes = os.path.getsize(job.file)
+                JOURNAL.start(job, params)
+                JOURNAL.state(job)
+                EXPIRY.schedule(job)
+                DISK.track(job)
+            else:
+                _enqueue_job(job, params, rec.get("client") or "")
+        for home, n in holders.items():
+            # the first holder is the dir's implicit reference, as for a live leader
+            for _ in range(n - 1):
+                _retain_dir(home)
+        # temp dirs under this journal's root that nobody claims (older than a minute, so peers
+        # booting alongside are left alone); other instances keep theirs under their own roots
+        for p in TEMP_ROOT.glob("mvd_*"):
+            try:
+                if p.is_dir() and str(p) not in claimed and now - p.stat().st_mtime > 60:
+                    shutil.rmtree(p, ignore_errors=True)
+            except OSError:
+                pass
+        if DEBUG_LOG:
+            print(f"[journal] recovered {len(survivors)} job(s)")
+    except Exception as e:
+        print("[journal] recovery failed:", repr(e))
+    finally:
+        JOURNAL.release_cold_start()
 
 
-threading.Thread(target=cleanup_worker, daemon=True).start()
+recover_jobs()
+threading.Thread(target=EXPIRY.run, name="expiry", daemon=True).start()
 
 @app.get("/p1")
 def p1():
@@ -1342,15 +4534,71 @@ Sitemap: https://yt-downloader-1-3o61.onrender.com/sitemap.xml
     return txt, 200, {"Content-Type": "text/plain"}
 
 
+# ---------- Home page ----------
+def _static_versions() -> dict:
+    """filename -> short content hash for everything in static/, used as ?v= on asset URLs."""
+    folder = Path(app.static_folder or "")
+    if not folder.is_dir():
+        return {}
+    return {p.name: hashlib.sha1(p.read_bytes()).hexdigest()[:10] for p in folder.iterdir() if p.is_file()}
+
+
+STATIC_VERSIONS = _static_versions()
+
+
+class StaticPage:
+    """A page rendered once, kept as bytes with gzip (and brotli, if installed) variants.
+
+    Each variant has its own strong ETag; the HTML itself is revalidated on every visit
+    (no-cache), which costs a 304 and lets a deploy show up immediately.
+    """
+
+    def __init__(self, body: bytes):
+        tag = hashlib.sha1(body).hexdigest()[:16]
+        self.variants = {"identity": (body, tag), "gzip": (gzip.compress(body, 9, mtime=0), f"{tag}-gz")}
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body, quality=11), f"{tag}-br")
+
+    def _encoding(self) -> str:
+        accept = request.accept_encodings
+        best, best_q = "identity", 0
+        for enc in ("br", "gzip"):
+            q = accept.quality(enc) if enc in self.variants else 0
+            if q > best_q:
+                best, best_q = enc, q
+        return best
+
+    def response(self) -> Response:
+        enc = self._encoding()
+        body, etag = self.variants[enc]
+        headers = {"ETag": f'"{etag}"', "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        return Response(body, headers=headers, mimetype="text/html")
+
+
+def _render_home() -> bytes:
+    html = HTML
+    for name, v in STATIC_VERSIONS.items():
+        html = html.replace(f'"/static/{name}"', f'"/static/{name}?v={v}"')
+    with app.app_context():
+        return render_template_string(html).encode("utf-8")
+
+
+HOME_PAGE = StaticPage(_render_home())
+
+
 @app.get("/")
 def home():
-    return render_template_string(HTML)
+    return HOME_PAGE.response()
 
 
 if __name__ == "__main__":
     if DEBUG_LOG:
         print("[INFO] Starting app with config:", {
-            "port": PORT, "ffmpeg": HAS_FFMPEG, "ffmpeg_path": _FFMPEG,
+            "port": PORT, "ffmpeg": has_ffmpeg(), "ffmpeg_path": ffmpeg_path(),
             "debug": DEBUG_LOG, "prefix": APP_PREFIX, "max_concurrent": MAX_CONCURRENT
         })
     app.run(host="0.0.0.0", port=PORT)
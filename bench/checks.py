@@ -0,0 +1,228 @@
+# bench/checks.py
+# -*- coding: utf-8 -*-
+"""Behaviour checks that need real yt-dlp runs, offline.
+
+    python bench/checks.py [name ...]     # all checks when no name is given
+
+Each check drives the Flask app through its test client against bench/media_server.py
+and the stub extractor in bench/yt_dlp_plugins, and asserts on what happened.
+Exit status is 1 if any check fails.
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("JOB_JOURNAL_PATH", "")
+os.environ.setdefault("OUTPUT_CACHE_BYTES", "0")
+os.environ.setdefault("JOB_TIMING_LOG", "0")
+os.environ.setdefault("YTDLP_WARMUP", "0")
+sys.path.insert(0, BENCH_DIR)  # media_server + yt_dlp_plugins
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import media_server  # noqa: E402
+import app  # noqa: E402
+
+CHECKS = {}
+THREADED = {"wsgi.multithread": True}  # the test client claims a sync server, which turns streaming off
+
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+
+def wait_done(client, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        p = client.get(f"/progress/{job_id}").json
+        if p["status"] in ("finished", "error"):
+            return p
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish in {timeout}s")
+
+
+@check
+def audio_job_reusing_av_preview(srv, client):
+    """An audio job started after a v+a /info preview downloads only the audio format."""
+    url = f"{srv.base_url}/watch/split/reuse?video_size=2000000&audio_size=300000"
+    assert client.post("/info", json={"url": url}).status_code == 200
+    preview = app.INFO_CACHE.peek(url).info
+    assert [f["format_id"] for f in preview["requested_formats"]] == ["v", "a"], preview.get("format_id")
+
+    seen = []
+    staged = app.ytdlp().StagedYoutubeDL
+    orig = staged.process_info
+
+    def process_info(self, info):
+        seen.append((info.get("format_id"), [f["format_id"] for f in info.get("requested_formats") or []]))
+        return orig(self, info)
+
+    staged.process_info = process_info
+    try:
+        sent = srv.bytes_sent
+        p = wait_done(client, client.post("/start", json={"url": url, "format_choice": "audio"}).json["job_id"])
+    finally:
+        staged.process_info = orig
+    assert p["status"] == "finished", p["error"]
+    assert seen == [("a", [])], seen
+    assert srv.bytes_sent - sent == 300000, srv.bytes_sent - sent
+
+
+@check
+def deferred_post_process_sees_full_info(srv, client):
+    """Post-processors deferred to the postprocess stage still get the info fields they read."""
+    log = os.path.join(tempfile.mkdtemp(prefix="probe_"), "seen.jsonl")
+    orig = app._download_profile
+
+    def probed(fmt_key, abitrate=None):
+        name, opts = orig(fmt_key, abitrate)
+        probe = {"key": "BenchProbe", "log": log, "when": "post_process"}
+        opts["postprocessors"] = [*opts.get("postprocessors", ()), probe]
+        return name + "+probe", opts
+
+    app._download_profile = probed
+    try:
+        url = f"{srv.base_url}/watch/progressive/probe?size=200000"
+        p = wait_done(client, client.post("/start", json={"url": url}).json["job_id"])
+    finally:
+        app._download_profile = orig
+    assert p["status"] == "finished", p["error"]
+    assert "postprocess_start" in p["timings"], p["timings"]
+    with open(log, encoding="utf-8") as f:
+        seen = [json.loads(line) for line in f]
+    shutil.rmtree(os.path.dirname(log))
+    assert len(seen) == 1, seen
+    assert (seen[0]["id"], seen[0]["title"], seen[0]["ext"]) == ("probe", "bench progressive probe", "mp4"), seen
+
+
+@check
+def channel_batch_queues_only_videos(srv, client):
+    """A channel that lists its tabs as playlists is expanded to the tabs' videos, not the tabs."""
+    url = f"{srv.base_url}/watch/channel/chan?tabs=2&entries=3&size=50000"
+    sent = srv.bytes_sent
+    p = wait_done(client, client.post("/start-batch", json={"url": url}).json["job_id"], timeout=60)
+    assert p["status"] == "finished", p["error"]
+    assert [e["status"] for e in p["entries"]] == ["finished"] * 6, p["entries"]
+    sizes = [os.path.getsize(app.JOBS.get(e["id"]).file) for e in p["entries"]]
+    assert sizes == [50000] * 6, sizes
+    assert srv.bytes_sent - sent == 6 * 50000, srv.bytes_sent - sent
+
+
+@check
+def fragment_jobs_share_bandwidth_cap(srv, client):
+    """Two HLS jobs, the second joining later, stay under BANDWIDTH_LIMIT_BYTES together."""
+    cap = 1_000_000
+    app.GOVERNOR.limit = cap
+    threading.Thread(target=app.GOVERNOR.run, name="bandwidth", daemon=True).start()
+    try:
+        first = client.post("/start", json={"url": f"{srv.base_url}/watch/hls/capA?segments=40&seg_bytes=100000"})
+        time.sleep(1.0)
+        second = client.post("/start", json={"url": f"{srv.base_url}/watch/hls/capB?segments=40&seg_bytes=100000"})
+        time.sleep(1.0)
+        sent, t0 = srv.bytes_sent, time.monotonic()
+        time.sleep(2.0)
+        rate = (srv.bytes_sent - sent) / (time.monotonic() - t0)
+        for r in (first, second):
+            assert wait_done(client, r.json["job_id"], timeout=60)["status"] == "finished"
+    finally:
+        app.GOVERNOR.limit = 0
+    assert rate <= cap * 1.15, f"{rate:.0f} B/s with a cap of {cap}"
+
+
+@check
+def disk_wait_frees_download_slot(srv, client):
+    """Jobs waiting for disk space leave the download slots to a job that fits."""
+    slow = media_server.start(bandwidth=2_000_000)
+    budget, app.DISK.budget = app.DISK.budget, app.DISK.stats()["reserved_bytes"] + 5_400_000  # earlier checks' files
+    try:
+        first = client.post("/start", json={"url": f"{slow.base_url}/watch/progressive/diskA?size=3000000"}).json
+        time.sleep(0.3)
+        # neither fits next to the first job; with MAX_CONCURRENT=3 both would hold a slot while waiting
+        big = [client.post("/start", json={"url": f"{srv.base_url}/watch/progressive/diskB{i}?size=2000000"}).json
+               for i in range(2)]
+        small = client.post("/start", json={"url": f"{srv.base_url}/watch/progressive/diskC?size=100000"}).json
+        assert wait_done(client, small["job_id"], timeout=10)["status"] == "finished"
+        assert client.get(f"/progress/{first['job_id']}").json["status"] == "downloading"
+        for r in big:
+            assert client.get(f"/progress/{r['job_id']}").json["stage"] == "waiting_disk"
+        assert wait_done(client, first["job_id"])["status"] == "finished"
+        # once the first file is fetched it can be evicted to make room
+        client.get(f"/fetch/{first['job_id']}").close()
+        for r in big:
+            assert wait_done(client, r["job_id"])["status"] == "finished"
+    finally:
+        app.DISK.budget = budget
+        slow.shutdown()
+
+
+def open_stream(client, job_id, timeout=30):
+    """Wait for the job to offer /fetch/<id>/stream and open it unbuffered."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        p = client.get(f"/progress/{job_id}", environ_overrides=THREADED).json
+        if p.get("stream_url"):
+            return client.get(p["stream_url"], environ_overrides=THREADED, buffered=False)
+        assert p["status"] == "downloading" or p["status"] == "queued", p
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} offered no stream in {timeout}s")
+
+
+@check
+def stream_sends_content_length(srv, client):
+    """A progressive stream announces the upstream size and delivers exactly that many bytes."""
+    slow = media_server.start(bandwidth=2_000_000)
+    url = f"{slow.base_url}/watch/progressive/streamlen?size=1500000"
+    r = open_stream(client, client.post("/start", json={"url": url}).json["job_id"])
+    assert r.headers.get("Content-Length") == "1500000", dict(r.headers)
+    assert sum(len(chunk) for chunk in r.response) == 1500000
+    r.close()
+    slow.shutdown()
+
+
+@check
+def stream_aborts_when_download_fails(srv, client):
+    """A stream whose download fails ends with an error, not a clean (truncated) body."""
+    slow = media_server.start(bandwidth=2_000_000)
+    url = f"{slow.base_url}/watch/progressive/streamcut?size=1500000&cut=400000"
+    job_id = client.post("/start", json={"url": url}).json["job_id"]
+    r = open_stream(client, job_id)
+    got = 0
+    try:
+        for chunk in r.response:
+            got += len(chunk)
+    except app.StreamAborted:
+        pass
+    else:
+        raise AssertionError(f"stream ended cleanly after {got} bytes")
+    finally:
+        r.close()
+        slow.shutdown()
+    assert got < 1500000, got
+    assert client.get(f"/progress/{job_id}").json["status"] == "error"
+
+
+def main():
+    names = sys.argv[1:] or list(CHECKS)
+    os.chdir(tempfile.gettempdir())  # yt-dlp saves ./cookies.txt; keep it out of the checkout
+    srv = media_server.start()
+    client = app.app.test_client()
+    failed = 0
+    for name in names:
+        try:
+            CHECKS[name](srv, client)
+            print(f"ok    {name}")
+        except Exception:
+            failed += 1
+            print(f"FAIL  {name}")
+            traceback.print_exc()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# bench/cold_start.py
+# -*- coding: utf-8 -*-
+"""Cold start: time from process spawn to the first answered request.
+
+    python bench/cold_start.py [--runs 5] [--json]
+
+Each run starts a fresh ``python app.py`` on a free port and polls it every few
+milliseconds. Reported per YTDLP_WARMUP setting (medians over the runs):
+
+  first_response  spawn -> first 200 from /
+  robots          the first /robots.txt right after that
+  first_info      the first /info afterwards (loads yt-dlp unless the warmup already did)
+
+/info resolves a bench/media_server.py URL through the stub extractor in
+bench/yt_dlp_plugins, so no network is involved.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import media_server  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request(url, data=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, body, {"Content-Type": "application/json"} if body else {})
+    with urllib.request.urlopen(req, timeout=30) as r:
+        return r.status, r.read()
+
+
+def one_run(warmup, media_url, pause):
+    port = free_port()
+    env = {
+        **os.environ, "PORT": str(port), "YTDLP_WARMUP": "1" if warmup else "0", "JOB_JOURNAL_PATH": "",
+        "OUTPUT_CACHE_BYTES": "0", "PYTHONPATH": os.pathsep.join([BENCH_DIR, os.environ.get("PYTHONPATH", "")]),
+    }
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    # yt-dlp saves its cookie jar to ./cookies.txt; keep that out of the checkout
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "app.py")], env=env, cwd=tempfile.gettempdir(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                if request(base + "/")[0] == 200:
+                    break
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError("app.py exited during startup")
+                time.sleep(0.005)
+        first = time.perf_counter() - t0
+        t = time.perf_counter()
+        request(base + "/robots.txt")
+        robots = time.perf_counter() - t
+        # a user reads the page before pasting a link; the warmup gets that long to finish
+        time.sleep(pause)
+        t = time.perf_counter()
+        status, body = request(base + "/info", {"url": media_url})
+        info = time.perf_counter() - t
+        if status != 200 or b"error" in body:
+            raise RuntimeError(f"/info failed: {body[:200]!r}")
+        return {"first_response": first, "robots": robots, "first_info": info}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--pause", type=float, default=1.0, help="seconds between first response and /info")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    srv = media_server.start()
+    media_url = f"{srv.base_url}/watch/progressive/cold?size=1000"
+    report = {}
+    for warmup in (False, True):
+        runs = [one_run(warmup, media_url, args.pause) for _ in range(args.runs)]
+        report[f"warmup={int(warmup)}"] = {
+            k: round(statistics.median(r[k] for r in runs) * 1000, 1) for k in runs[0]
+        }
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"{'':<10}{'first / ms':>12}{'robots ms':>11}{'first /info ms':>16}")
+    for name, r in report.items():
+        print(f"{name:<10}{r['first_response']:>12}{r['robots']:>11}{r['first_info']:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# bench/e2e.py
+# -*- coding: utf-8 -*-
+"""End-to-end throughput: N concurrent /start -> /progress -> /fetch cycles, no network.
+
+    python bench/e2e.py [--jobs 50] [--concurrency 8] [--kind progressive|hls|mixed]
+                        [--size 2000000] [--bandwidth 0] [--latency 0] [--json]
+
+A local media server (bench/media_server.py) serves synthetic files and the stub
+extractor in bench/yt_dlp_plugins resolves page URLs to it, so yt-dlp runs its normal
+extraction, format selection and download paths. Requests go through the Flask app's
+test client, one per driver thread. Set app env vars (MAX_CONCURRENT, OUTPUT_CACHE_BYTES,
+...) in the environment as usual; the journal and output cache are off unless given.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("JOB_JOURNAL_PATH", "")
+os.environ.setdefault("OUTPUT_CACHE_BYTES", "0")
+os.environ.setdefault("JOB_TIMING_LOG", "0")
+os.environ.setdefault("MAX_QUEUED_PER_CLIENT", str(10 ** 6))
+sys.path.insert(0, BENCH_DIR)  # media_server + yt_dlp_plugins
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import media_server  # noqa: E402
+import app  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def job_url(base, kind, i, args):
+    if kind == "hls":
+        seg_bytes = max(1, args.size // args.segments)
+        return f"{base}/watch/hls/bench{i}?segments={args.segments}&seg_bytes={seg_bytes}"
+    return f"{base}/watch/progressive/bench{i}?size={args.size}"
+
+
+def cycle(url, poll, timeout):
+    """One user: start, poll until finished, fetch. Returns (ok, seconds, bytes, error)."""
+    client = app.app.test_client()
+    t0 = time.perf_counter()
+    r = client.post("/start", json={"url": url, "format_choice": "video"})
+    if r.status_code != 200:
+        return False, time.perf_counter() - t0, 0, f"start {r.status_code}"
+    jid = r.json["job_id"]
+    deadline = t0 + timeout
+    while True:
+        p = client.get(f"/progress/{jid}").json
+        if p["status"] in ("finished", "error"):
+            break
+        if time.perf_counter() > deadline:
+            return False, time.perf_counter() - t0, 0, "timeout"
+        time.sleep(poll)
+    if p["status"] == "error":
+        return False, time.perf_counter() - t0, 0, p.get("error") or "error"
+    r = client.get(f"/fetch/{jid}", buffered=False)
+    n = 0
+    for chunk in r.response:
+        n += len(chunk)
+    r.close()
+    return r.status_code == 200, time.perf_counter() - t0, n, None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--jobs", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=8, help="simultaneous users")
+    ap.add_argument("--kind", choices=("progressive", "hls", "mixed"), default="progressive")
+    ap.add_argument("--size", type=int, default=2_000_000, help="bytes per media file")
+    ap.add_argument("--segments", type=int, default=20, help="HLS segments per file")
+    ap.add_argument("--bandwidth", type=float, default=0, help="media server bytes/s per connection")
+    ap.add_argument("--latency", type=float, default=0.0, help="media server seconds per response")
+    ap.add_argument("--poll", type=float, default=0.05, help="seconds between /progress polls")
+    ap.add_argument("--timeout", type=float, default=300)
+    ap.add_argument("--same-url", action="store_true", help="every job asks for the same video")
+    ap.add_argument("--json", action="store_true", help="print one JSON object instead of a table")
+    args = ap.parse_args()
+
+    server = media_server.start(bandwidth=args.bandwidth, latency=args.latency)
+    kinds = ["progressive", "hls"] if args.kind == "mixed" else [args.kind]
+    urls = [job_url(server.base_url, kinds[i % len(kinds)], 0 if args.same_url else i, args) for i in range(args.jobs)]
+
+    # yt-dlp writes its progress lines to stdout; keep the report readable
+    devnull = open(os.devnull, "w")
+    real_stdout, sys.stdout = sys.stdout, devnull
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda u: cycle(u, args.poll, args.timeout), urls))
+    finally:
+        sys.stdout = real_stdout
+        devnull.close()
+    wall = time.perf_counter() - t0
+    # finished jobs would otherwise leave their temp dirs behind until DOWNLOAD_KEEP_SECONDS
+    for job in app.JOBS.values():
+        app.JOBS.pop(job.id)
+        app._discard_job(job)
+
+    ok = [r for r in results if r[0]]
+    latencies = [r[1] for r in ok]
+    fetched = sum(r[2] for r in ok)
+    errors = {}
+    for r in results:
+        if not r[0]:
+            errors[r[3]] = errors.get(r[3], 0) + 1
+    report = {
+        "jobs": args.jobs,
+        "concurrency": args.concurrency,
+        "kind": args.kind,
+        "ok": len(ok),
+        "wall_s": round(wall, 3),
+        "jobs_per_s": round(len(ok) / wall, 3) if wall else None,
+        "p50_s": round(percentile(latencies, 50), 3) if latencies else None,
+        "p99_s": round(percentile(latencies, 99), 3) if latencies else None,
+        "mean_s": round(statistics.mean(latencies), 3) if latencies else None,
+        "fetched_bytes_per_s": round(fetched / wall) if wall else None,
+        "upstream_bytes": server.bytes_sent,
+        "peak_rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "threads": threading.active_count(),
+        "errors": errors,
+    }
+    if args.json:
+        print(json.dumps(report))
+        return
+    for k, v in report.items():
+        print(f"{k:<22}{v}")
+
+
+if __name__ == "__main__":
+    main()
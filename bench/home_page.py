@@ -0,0 +1,78 @@
+# bench/home_page.py
+# -*- coding: utf-8 -*-
+"""Home page requests/s: render per request (the old home()) vs. the prerendered variants.
+
+    python bench/home_page.py [--duration 3] [--json]
+
+Every case goes through the Flask app's test client on one thread, so the numbers are
+server-side cost per request (routing, body, headers) without socket overhead:
+
+  render      render_template_string(HTML) on every hit, as home() used to do
+  identity    prerendered bytes, no Accept-Encoding
+  gzip        prerendered gzip variant
+  br          prerendered brotli variant (only if the brotli package is installed)
+  304         conditional GET with a matching ETag
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+os.environ.setdefault("JOB_JOURNAL_PATH", "")
+os.environ.setdefault("OUTPUT_CACHE_BYTES", "0")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import app  # noqa: E402
+from flask import render_template_string  # noqa: E402
+
+
+@app.app.get("/_bench/render")
+def _render_per_request():
+    return render_template_string(app.HTML)
+
+
+def measure(client, path, headers, duration):
+    n, wire = 0, 0
+    end = time.perf_counter() + duration
+    t0 = time.perf_counter()
+    while time.perf_counter() < end:
+        r = client.get(path, headers=headers)
+        wire = len(r.data)
+        n += 1
+    return {"rps": round(n / (time.perf_counter() - t0), 1), "status": r.status_code, "bytes": wire}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--duration", type=float, default=3, help="seconds per case")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    client = app.app.test_client()
+    etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    cases = [
+        ("render", "/_bench/render", {}),
+        ("identity", "/", {}),
+        ("gzip", "/", {"Accept-Encoding": "gzip"}),
+    ]
+    if "br" in app.HOME_PAGE.variants:
+        cases.append(("br", "/", {"Accept-Encoding": "br"}))
+    cases.append(("304", "/", {"Accept-Encoding": "gzip", "If-None-Match": etag}))
+
+    report = {name: measure(client, path, headers, args.duration) for name, path, headers in cases}
+    base = report["render"]["rps"] or 1
+    for r in report.values():
+        r["speedup"] = round(r["rps"] / base, 2)
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    print(f"{'case':<10}{'req/s':>10}{'speedup':>9}{'status':>8}{'bytes':>9}")
+    for name, r in report.items():
+        print(f"{name:<10}{r['rps']:>10}{r['speedup']:>9}{r['status']:>8}{r['bytes']:>9}")
+
+
+if __name__ == "__main__":
+    main()
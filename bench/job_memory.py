@@ -0,0 +1,116 @@
+# bench/job_memory.py
+# -*- coding: utf-8 -*-
+"""Per-job memory footprint of app.Job vs. the original dict-backed Job.
+
+    python bench/job_memory.py [--jobs 100000]
+
+The legacy class below mirrors the pre-__slots__ Job (eager Condition, followers list,
+one mkdtemp per job). Its temp dirs are not created here, only counted.
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+os.environ.setdefault("JOB_JOURNAL_PATH", "")
+os.environ.setdefault("OUTPUT_CACHE_BYTES", "0")
+os.environ.setdefault("MAX_JOBS", str(10 ** 9))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+class LegacyJob:
+    def __init__(self):
+        self.id = str(uuid.uuid4())
+        self.tmp = None  # was Path(tempfile.mkdtemp(prefix="mvd_"))
+        self.percent = 0
+        self.status = "queued"
+        self.file = None
+        self.error = None
+        self.speed_bytes = 0.0
+        self.created_at = time.time()
+        self.downloaded_at = None
+        self.total_bytes = 0
+        self.downloaded_bytes = 0
+        self.download_name = None
+        self.meta = None
+        self.filename = None
+        self.dedupe_key = None
+        self.leader = None
+        self.followers = []
+        self.streamable = False
+        self.stream_path = None
+        self.stream_final = None
+        self.stream_done = False
+        self.stage = "queued"
+        self.version = 0
+        self.cond = threading.Condition()
+        self.snapshot = False
+        self.queue = None
+        self.journaled = None
+
+
+def measure(make, n):
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    table = make(n)
+    elapsed = time.perf_counter() - t0
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del table
+    gc.collect()
+    return used, elapsed
+
+
+def make_legacy(n):
+    table = {}
+    for _ in range(n):
+        j = LegacyJob()
+        table[j.id] = j
+    return table
+
+
+def make_current(n):
+    app.JOBS._jobs.clear()
+    for _ in range(n):
+        app.Job()
+    return app.JOBS._jobs
+
+
+def make_current_running(n):
+    # jobs that have received progress: condition and speed ring allocated (no temp dirs)
+    app.JOBS._jobs.clear()
+    for _ in range(n):
+        j = app.Job()
+        j.cond
+        for s in range(app.SPEED_SAMPLES * 2):
+            j.add_speed_sample(float(s))
+    return app.JOBS._jobs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--jobs", type=int, default=100000)
+    args = ap.parse_args()
+    n = args.jobs
+
+    rows = [
+        ("legacy (dict, eager)", make_legacy, f"{n} mkdtemp calls"),
+        ("slots, queued", make_current, "0 temp dirs"),
+        ("slots, with progress", make_current_running, "0 temp dirs"),
+    ]
+    print(f"{'variant':<24}{'total MiB':>12}{'bytes/job':>12}{'create s':>10}  disk")
+    for name, make, disk in rows:
+        used, elapsed = measure(make, n)
+        print(f"{name:<24}{used / 2 ** 20:>12.1f}{used / n:>12.0f}{elapsed:>10.2f}  {disk}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# bench/media_server.py
+# -*- coding: utf-8 -*-
+"""Local HTTP server with synthetic media for offline benchmarks.
+
+    python bench/media_server.py [--port 8765] [--bandwidth 5e6] [--latency 0.05]
+
+Routes (sizes come from the query string, bytes are generated on the fly):
+
+    /media/<id>.mp4?size=N                        progressive file, Range supported
+    /media/<id>.mp4?size=N&cut=K                  ... whose connections drop at byte K
+    /hls/<id>/index.m3u8?segments=N&seg_bytes=M   HLS VOD playlist
+    /hls/<id>/seg<k>.ts?seg_bytes=M               one HLS segment
+
+``bandwidth`` caps each connection in bytes/s (0 = unthrottled); ``latency`` is added
+before the first byte of every response.
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CHUNK = 64 * 1024
+_FILL = bytes(range(256)) * (CHUNK // 256)
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _query(self):
+        parts = urlsplit(self.path)
+        return parts.path, {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+    def _send_bytes(self, total, start=0, cut=None):
+        bandwidth = self.server.bandwidth
+        sent, t0 = 0, time.monotonic()
+        left = total - start if cut is None else max(0, min(total, cut) - start)
+        while left > 0:
+            n = min(left, CHUNK)
+            self.wfile.write(_FILL[:n])
+            left -= n
+            sent += n
+            self.server.count(n)
+            if bandwidth:
+                ahead = sent / bandwidth - (time.monotonic() - t0)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def _head(self, status, ctype, length, extra=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        path, q = self._query()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        try:
+            if path.startswith("/media/"):
+                size = int(q.get("size", self.server.default_size))
+                start, status, extra = 0, 200, {}
+                rng = self.headers.get("Range", "")
+                if rng.startswith("bytes="):
+                    start = int(rng[6:].split("-")[0] or 0)
+                    if start >= size:
+                        self._head(416, "video/mp4", 0, {"Content-Range": f"bytes */{size}"})
+                        return
+                    status, extra = 206, {"Content-Range": f"bytes {start}-{size - 1}/{size}"}
+                self._head(status, "video/mp4", size - start, extra)
+                if not head:
+                    cut = int(q["cut"]) if "cut" in q else None
+                    self._send_bytes(size, start, cut)
+                    if cut is not None:
+                        self.close_connection = True
+            elif path.startswith("/hls/") and path.endswith(".m3u8"):
+                segments = int(q.get("segments", self.server.default_segments))
+                seg_bytes = int(q.get("seg_bytes", self.server.default_seg_bytes))
+                body = "#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n"
+                body += "".join(f"#EXTINF:2.0,\nseg{k}.ts?seg_bytes={seg_bytes}\n" for k in range(segments))
+                body = (body + "#EXT-X-ENDLIST\n").encode()
+                self._head(200, "application/vnd.apple.mpegurl", len(body))
+                if not head:
+                    self.wfile.write(body)
+            elif path.startswith("/hls/") and path.endswith(".ts"):
+                seg_bytes = int(q.get("seg_bytes", self.server.default_seg_bytes))
+                self._head(200, "video/mp2t", seg_bytes)
+                if not head:
+                    self._send_bytes(seg_bytes)
+            else:
+                self._head(404, "text/plain", 0)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class MediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, bandwidth=0, latency=0.0, default_size=2_000_000,
+                 default_segments=20, default_seg_bytes=100_000):
+        super().__init__(addr, MediaHandler)
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.default_size = default_size
+        self.default_segments = default_segments
+        self.default_seg_bytes = default_seg_bytes
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def count(self, n):
+        with self._lock:
+            self.bytes_sent += n
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def start(port=0, **kwargs) -> MediaServer:
+    """Serve in a daemon thread; returns the server (see ``base_url``)."""
+    server = MediaServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, name="media-server", daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--bandwidth", type=float, default=0, help="bytes/s per connection, 0 = unthrottled")
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    args = ap.parse_args()
+    server = MediaServer(("127.0.0.1", args.port), bandwidth=args.bandwidth, latency=args.latency)
+    print(f"serving synthetic media on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
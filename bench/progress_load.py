@@ -0,0 +1,327 @@
+# bench/progress_load.py
+# -*- coding: utf-8 -*-
+"""Load test for /progress/<id>: thousands of polling tabs against fake-hook downloads.
+
+    python bench/progress_load.py [--tabs 1000] [--interval 0.8] [--duration 10] [--runs 1] [--json]
+    python bench/progress_load.py --sweep 250,500,1000,2000,4000   # where does latency break?
+    python bench/progress_load.py --check            # fail if bench/progress_budget.json regresses
+    python bench/progress_load.py --write-budget     # re-baseline (commit the result)
+
+The download pool's workers are occupied by fake downloads that drive real Job objects
+through the same field updates and _notify() calls as the yt-dlp progress hook, doing
+``--hook-work-us`` of pure-Python work per block to stand in for yt-dlp. More jobs wait
+behind them in the real scheduler, so queue-position lookups are exercised too.
+
+Requests arrive open-loop at tabs/interval per second; latency is measured from each
+request's scheduled time, so a backed-up server shows up as latency rather than as a
+lower request rate. Two phases run back to back:
+
+  idle   fake downloads only (baseline CPU, hook rate, GIL probe)
+  load   fake downloads + pollers
+
+With ``--runs N`` the load phase is repeated and every figure is the median over the runs.
+The committed budget uses a tab count well below the knee of a small machine (p99 climbs
+steeply from ~750 tabs on one core) and the median of three runs, so it flags regressions
+rather than scheduler noise.
+
+"CPU per request" is the load phase's extra process CPU divided by requests served.
+GIL contention is reported two ways: how late a 1 ms sleeper thread wakes up, and how far
+the fake downloads fall behind their block rate.
+"""
+import argparse
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGET_PATH = os.path.join(BENCH_DIR, "progress_budget.json")
+os.environ.setdefault("JOB_JOURNAL_PATH", "")
+os.environ.setdefault("OUTPUT_CACHE_BYTES", "0")
+os.environ.setdefault("JOB_TIMING_LOG", "0")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import app  # noqa: E402
+
+SCENARIO_KEYS = ("tabs", "interval", "duration", "runs", "queued", "finished", "hook_hz", "hook_work_us", "workers")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def spin(us):
+    """Hold the GIL for roughly ``us`` microseconds."""
+    end = time.perf_counter() + us / 1e6
+    n = 0
+    while time.perf_counter() < end:
+        n += 1
+    return n
+
+
+class FakeDownload:
+    """Stands in for one yt-dlp download: a block every 1/hook_hz seconds, forever."""
+
+    def __init__(self, job, hook_hz, work_us, stop):
+        self.job, self.period, self.work_us, self.stop = job, 1.0 / hook_hz, work_us, stop
+        self.blocks = 0
+        self.lag = []
+
+    def hook(self, downloaded, total):
+        job = self.job
+        job.status = "downloading"
+        job.mark("download_start")
+        job.total_bytes = total
+        job.downloaded_bytes = downloaded
+        job.add_speed_sample(1_000_000.0)
+        job.percent = int(downloaded * 100 / total)
+        app._notify(job)
+        app._mirror_progress(job)
+
+    def run(self):
+        total, downloaded = 10 ** 9, 0
+        nxt = time.perf_counter()
+        while not self.stop.is_set():
+            spin(self.work_us)
+            downloaded = (downloaded + 64 * 1024) % total
+            self.hook(downloaded, total)
+            self.blocks += 1
+            nxt += self.period
+            delay = nxt - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.lag.append(-delay)
+
+
+def gil_probe(stop, out):
+    while not stop.is_set():
+        t = time.perf_counter()
+        time.sleep(0.001)
+        out.append(time.perf_counter() - t - 0.001)
+
+
+def setup(args, stop):
+    """Occupy every download worker with fake downloads and queue jobs behind them."""
+    downloads = []
+    for _ in range(app.executor.workers):
+        job = app.Job()
+        fake = FakeDownload(job, args.hook_hz, args.hook_work_us, stop)
+        downloads.append(fake)
+        app.executor.submit(fake.run, client="bench-running", job=job)
+    # let the workers pick them up before anything else is queued
+    deadline = time.time() + 5
+    while app.executor.stats()["running"] < len(downloads) and time.time() < deadline:
+        time.sleep(0.01)
+    queued = []
+    for i in range(args.queued):
+        job = app.Job()
+        app.executor.submit(lambda: None, client=f"bench-client-{i % 50}", job=job)
+        queued.append(job)
+    finished = []
+    for _ in range(args.finished):
+        job = app.Job()
+        job.status, job.stage, job.percent = "finished", "done", 100
+        finished.append(job)
+    return downloads, [d.job.id for d in downloads] + [j.id for j in queued] + [j.id for j in finished]
+
+
+def phase(seconds, downloads, load=None):
+    probe, stop = [], threading.Event()
+    t = threading.Thread(target=gil_probe, args=(stop, probe), daemon=True)
+    blocks0 = sum(d.blocks for d in downloads)
+    for d in downloads:
+        d.lag.clear()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    t.start()
+    result = load(seconds) if load else time.sleep(seconds)
+    stop.set()
+    t.join()
+    wall = time.perf_counter() - wall0
+    return {
+        "cpu_s": time.process_time() - cpu0,
+        "wall_s": wall,
+        "hook_rate": (sum(d.blocks for d in downloads) - blocks0) / wall,
+        "hook_lag": [x for d in downloads for x in d.lag],
+        "probe": probe,
+        "load": result,
+    }
+
+
+def run_pollers(args, tabs, job_ids):
+    rate = tabs / args.interval
+
+    def load(seconds):
+        todo = queue.Queue()
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def worker():
+            client = app.app.test_client()
+            mine = []
+            while True:
+                item = todo.get()
+                if item is None:
+                    break
+                sched, jid = item
+                delay = sched - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                r = client.get(f"/progress/{jid}")
+                mine.append(time.perf_counter() - sched)
+                if r.status_code != 200:
+                    with lock:
+                        errors[0] += 1
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.workers)]
+        for t in threads:
+            t.start()
+        start = time.perf_counter()
+        n = int(rate * seconds)
+        for i in range(n):
+            sched = start + i / rate
+            # feed the queue a little ahead of time so workers never idle on the scheduler
+            while sched - time.perf_counter() > 0.05:
+                time.sleep(0.01)
+            todo.put((sched, job_ids[i % len(job_ids)]))
+        for _ in threads:
+            todo.put(None)
+        for t in threads:
+            t.join()
+        return {"requests": len(latencies), "latencies": latencies, "errors": errors[0]}
+
+    return load
+
+
+def parse_args():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--tabs", type=int, default=1000, help="simulated browser tabs")
+    ap.add_argument("--sweep", help="comma-separated tab counts to run one after another (no budget check)")
+    ap.add_argument("--interval", type=float, default=0.8, help="seconds between polls per tab")
+    ap.add_argument("--duration", type=float, default=10, help="seconds per phase")
+    ap.add_argument("--runs", type=int, default=1, help="load phases to run; figures are medians over them")
+    ap.add_argument("--queued", type=int, default=200, help="jobs waiting in the download queue")
+    ap.add_argument("--finished", type=int, default=200, help="finished jobs being polled")
+    ap.add_argument("--hook-hz", type=float, default=50, help="progress hook calls per second per download")
+    ap.add_argument("--hook-work-us", type=float, default=200, help="GIL-holding work per hook call")
+    ap.add_argument("--workers", type=int, default=16, help="request threads (server threads)")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit 1 if the budget in progress_budget.json is exceeded")
+    ap.add_argument("--write-budget", action="store_true", help="store this run (with headroom) as the budget")
+    ap.add_argument("--budget", default=BUDGET_PATH)
+    return ap.parse_args()
+
+
+def summarize(args, tabs, idle, busy):
+    lat = busy["load"]["latencies"]
+    requests = busy["load"]["requests"] or 1
+    extra_cpu = busy["cpu_s"] - idle["cpu_s"] * busy["wall_s"] / idle["wall_s"]
+    return {
+        "scenario": {**{k: getattr(args, k) for k in SCENARIO_KEYS}, "tabs": tabs},
+        "requests": busy["load"]["requests"],
+        "errors": busy["load"]["errors"],
+        "offered_rps": round(tabs / args.interval, 1),
+        "served_rps": round(busy["load"]["requests"] / busy["wall_s"], 1),
+        "served_ratio": round(busy["load"]["requests"] / busy["wall_s"] / (tabs / args.interval), 3),
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p90_ms": round(percentile(lat, 90) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "max_ms": round(max(lat or [0]) * 1000, 2),
+        "cpu_ms_per_request": round(max(0.0, extra_cpu) / requests * 1000, 3),
+        "hook_rate_idle": round(idle["hook_rate"], 1),
+        "hook_rate_load": round(busy["hook_rate"], 1),
+        "hook_rate_ratio": round(busy["hook_rate"] / idle["hook_rate"], 3) if idle["hook_rate"] else None,
+        "hook_lag_p99_ms": round(percentile(busy["hook_lag"], 99) * 1000, 2),
+        "gil_probe_p99_ms_idle": round(percentile(idle["probe"], 99) * 1000, 2),
+        "gil_probe_p99_ms_load": round(percentile(busy["probe"], 99) * 1000, 2),
+    }
+
+
+def median_report(runs):
+    """Per-figure median over repeated load phases; other fields come from the first run."""
+    if len(runs) == 1:
+        return runs[0]
+    return {k: round(statistics.median(r[k] for r in runs), 3) if isinstance(v, (int, float)) else v
+            for k, v in runs[0].items()}
+
+
+def main():
+    args = parse_args()
+    budget = None
+    if args.check:
+        with open(args.budget, encoding="utf-8") as f:
+            budget = json.load(f)
+        # the budget is only meaningful for the scenario it was measured with
+        for k in SCENARIO_KEYS:
+            setattr(args, k, budget["scenario"][k])
+        args.sweep = None
+
+    stop = threading.Event()
+    downloads, job_ids = setup(args, stop)
+    try:
+        idle = phase(args.duration, downloads)
+        if args.sweep:
+            print(f"{'tabs':>6}{'offered':>9}{'served':>9}{'p50 ms':>9}{'p99 ms':>9}{'cpu ms/req':>11}"
+                  f"{'hook ratio':>11}{'gil p99':>9}")
+            for tabs in (int(t) for t in args.sweep.split(",")):
+                r = summarize(args, tabs, idle, phase(args.duration, downloads, run_pollers(args, tabs, job_ids)))
+                print(f"{tabs:>6}{r['offered_rps']:>9}{r['served_rps']:>9}{r['p50_ms']:>9}{r['p99_ms']:>9}"
+                      f"{r['cpu_ms_per_request']:>11}{r['hook_rate_ratio']:>11}{r['gil_probe_p99_ms_load']:>9}")
+            return
+        runs = []
+        for _ in range(max(1, args.runs)):
+            busy = phase(args.duration, downloads, run_pollers(args, args.tabs, job_ids))
+            runs.append(summarize(args, args.tabs, idle, busy))
+    finally:
+        stop.set()
+    report = median_report(runs)
+
+    if args.write_budget:
+        out = {
+            "scenario": report["scenario"],
+            # generous headroom: the budget should catch regressions, not machine noise. Below the
+            # knee, tail latency is scheduler jitter and swings several-fold between runs on a
+            # shared box; past it the backlog grows for the whole phase and p99 reaches seconds.
+            # CPU per request and the served/offered ratio are the steady figures.
+            "max": {
+                "p50_ms": round(report["p50_ms"] * 4 + 3, 1),
+                "p99_ms": round(report["p99_ms"] * 5 + 100, 1),
+                "cpu_ms_per_request": round(report["cpu_ms_per_request"] * 1.5 + 0.1, 3),
+                "gil_probe_p99_ms_load": round(report["gil_probe_p99_ms_load"] * 3 + 25, 1),
+                "errors": 0,
+            },
+            "min": {
+                "hook_rate_ratio": round(min(0.9, report["hook_rate_ratio"] * 0.9), 2),
+                "served_ratio": round(min(0.97, report["served_ratio"] - 0.02), 3),
+            },
+        }
+        with open(args.budget, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+            f.write("\n")
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for k, v in report.items():
+            print(f"{k:<24}{v}")
+
+    if budget is not None:
+        failures = [f"{k} {report[k]} > {v}" for k, v in budget.get("max", {}).items() if report[k] > v]
+        failures += [f"{k} {report[k]} < {v}" for k, v in budget.get("min", {}).items() if report[k] < v]
+        for msg in failures:
+            print("BUDGET EXCEEDED:", msg)
+        if failures:
+            sys.exit(1)
+        print("within budget")
+
+
+if __name__ == "__main__":
+    main()
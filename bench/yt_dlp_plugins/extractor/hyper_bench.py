@@ -0,0 +1,96 @@
+# bench/yt_dlp_plugins/extractor/hyper_bench.py
+# -*- coding: utf-8 -*-
+"""yt-dlp extractor stub for bench/media_server.py.
+
+yt-dlp picks it up when ``bench/`` is on sys.path. Page URLs look like
+
+    http://127.0.0.1:<port>/watch/progressive/<id>?size=N[&cut=K]
+    http://127.0.0.1:<port>/watch/hls/<id>?segments=N&seg_bytes=M
+    http://127.0.0.1:<port>/watch/split/<id>?video_size=N&audio_size=M
+    http://127.0.0.1:<port>/watch/playlist/<id>?entries=N&entry_kind=progressive&page_delay=S
+    http://127.0.0.1:<port>/watch/channel/<id>?tabs=T&entries=N...
+
+and resolve to the server's /media and /hls routes without any network request. Playlist
+entries are generated lazily, ``page_delay`` seconds apart, like a paged channel listing;
+the remaining query parameters are passed on to every entry. A channel lists ``tabs``
+playlists, the way a YouTube channel page lists its Videos/Shorts/Live tabs.
+"""
+import time
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from yt_dlp.extractor.common import InfoExtractor
+
+
+def _split(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}", {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+
+class HyperBenchIE(InfoExtractor):
+    IE_NAME = "hyperbench"
+    _VALID_URL = r"https?://(?:127\.0\.0\.1|localhost)(?::\d+)?/watch/(?P<kind>progressive|hls|split)/(?P<id>[\w-]+)"
+    _RETURN_TYPE = "video"
+
+    def _real_extract(self, url):
+        kind, video_id = self._match_valid_url(url).group("kind", "id")
+        origin, q = _split(url)
+        info = {"id": video_id, "title": f"bench {kind} {video_id}", "duration": 60, "uploader": "bench"}
+        if kind == "progressive":
+            size = int(q.get("size", 2_000_000))
+            media_q = {"size": size, **({"cut": q["cut"]} if "cut" in q else {})}
+            info["formats"] = [{
+                "format_id": "mp4", "url": f"{origin}/media/{video_id}.mp4?{urlencode(media_q)}",
+                "ext": "mp4", "filesize": size, "vcodec": "avc1", "acodec": "mp4a", "height": 360,
+            }]
+        elif kind == "split":
+            # separate video-only and audio-only streams, like YouTube's DASH formats
+            vsize, asize = int(q.get("video_size", 2_000_000)), int(q.get("audio_size", 300_000))
+            info["formats"] = [{
+                "format_id": "v", "url": f"{origin}/media/{video_id}-v.mp4?{urlencode({'size': vsize})}",
+                "ext": "mp4", "filesize": vsize, "vcodec": "avc1", "acodec": "none", "height": 360,
+            }, {
+                "format_id": "a", "url": f"{origin}/media/{video_id}-a.m4a?{urlencode({'size': asize})}",
+                "ext": "m4a", "filesize": asize, "vcodec": "none", "acodec": "mp4a", "abr": 128,
+            }]
+        else:
+            segments, seg_bytes = int(q.get("segments", 20)), int(q.get("seg_bytes", 100_000))
+            playlist = f"{origin}/hls/{video_id}/index.m3u8?{urlencode({'segments': segments, 'seg_bytes': seg_bytes})}"
+            info["formats"] = [{
+                "format_id": "hls", "url": playlist, "manifest_url": playlist, "ext": "mp4",
+                "protocol": "m3u8_native", "filesize_approx": segments * seg_bytes,
+                "vcodec": "avc1", "acodec": "mp4a", "height": 360,
+            }]
+        return info
+
+
+class HyperBenchListIE(InfoExtractor):
+    IE_NAME = "hyperbench:list"
+    _VALID_URL = r"https?://(?:127\.0\.0\.1|localhost)(?::\d+)?/watch/(?P<kind>playlist|channel)/(?P<id>[\w-]+)"
+    _RETURN_TYPE = "playlist"
+
+    def _real_extract(self, url):
+        kind, playlist_id = self._match_valid_url(url).group("kind", "id")
+        origin, q = _split(url)
+        if kind == "channel":
+            return self._channel(origin, playlist_id, q)
+        return self._playlist(origin, playlist_id, q)
+
+    def _channel(self, origin, channel_id, q):
+        tabs = int(q.pop("tabs", 2))
+        query = f"?{urlencode(q)}" if q else ""
+        entries = [self.url_result(f"{origin}/watch/playlist/{channel_id}-tab{t}{query}", HyperBenchListIE)
+                   for t in range(tabs)]
+        return self.playlist_result(entries, channel_id, f"bench channel {channel_id}")
+
+    def _playlist(self, origin, playlist_id, q):
+        count, delay = int(q.pop("entries", 5)), float(q.pop("page_delay", 0))
+        entry_kind = q.pop("entry_kind", "progressive")
+        query = f"?{urlencode(q)}" if q else ""
+
+        def entries():
+            for i in range(count):
+                if i and delay:
+                    time.sleep(delay)
+                yield self.url_result(f"{origin}/watch/{entry_kind}/{playlist_id}-{i}{query}", HyperBenchIE)
+
+        return self.playlist_result(entries(), playlist_id, f"bench playlist {playlist_id}")
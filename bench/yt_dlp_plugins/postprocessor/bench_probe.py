@@ -0,0 +1,23 @@
+# bench/yt_dlp_plugins/postprocessor/bench_probe.py
+# -*- coding: utf-8 -*-
+"""yt-dlp post-processor stub that records what it was given.
+
+Add it with ``{"key": "BenchProbe", "log": path, "when": "post_process"}``; every run
+appends the fields real post-processors read (id, title, ext, filepath) to ``path`` as a
+JSON line. yt-dlp deep-copies its options and imports plugins under its own loader, so a
+file is the simplest way to get the results back.
+"""
+import json
+
+from yt_dlp.postprocessor.common import PostProcessor
+
+
+class BenchProbePP(PostProcessor):
+    def __init__(self, downloader=None, log=None):
+        super().__init__(downloader)
+        self.log = log
+
+    def run(self, info):
+        with open(self.log, "a", encoding="utf-8") as f:
+            f.write(json.dumps({k: info.get(k) for k in ("id", "title", "ext", "filepath")}) + "\n")
+        return [], info
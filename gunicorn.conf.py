@@ -0,0 +1,17 @@
+# gunicorn.conf.py
+# -*- coding: utf-8 -*-
+"""Loaded automatically by ``gunicorn app:app`` started from this directory.
+
+Live progress (SSE) and /fetch/<id>/stream hold a request open, so workers are threaded:
+a sync worker would be blocked by one open tab and killed at its timeout.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")  # gthread or gevent; sync disables live progress
+threads = int(os.environ.get("GUNICORN_THREADS", 32))  # open requests per worker
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))  # jobs live in memory; more than 1 needs JOB_STORE=sqlite
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+
+# SSE streams end (and the browser reconnects) well inside the worker timeout
+os.environ.setdefault("PROGRESS_STREAM_MAX_SECONDS", str(max(5, timeout // 2)))